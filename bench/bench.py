@@ -0,0 +1,290 @@
+'''
+Iono RP D16 benchmarks
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Scan-cycle cost benchmarks, for the device and for the host simulator.
+#
+# On the device, copy this file (and optionally a baseline as
+# bench_baseline.json) to the root of the filesystem and run:
+#   import bench; bench.main()
+# Do not run Iono.process() from another thread meanwhile.
+#
+# On the host, from the repository root:
+#   python3 bench/bench.py [--baseline FILE] [--out FILE] [--update] [--time]
+#
+# For each scenario the results hold, per call: the SPI frames and SPI
+# mutex acquisitions, the heap bytes and the execution time in us.
+# On the device the heap bytes are the ones allocated, measured with
+# gc.mem_alloc() with the garbage collector disabled; on the host they are
+# the peak of the memory traced by tracemalloc above the one at the start
+# of the call, the maximum over the calls.
+
+import sys
+import gc
+import json
+import time
+from array import array
+
+_HOST = sys.implementation.name != 'micropython'
+
+if _HOST:
+    import os
+    _ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [os.path.join(_ROOT, 'host'), os.path.join(_ROOT, 'lib')]
+    import tracemalloc
+    import iono_sim
+    iono_sim.install(virtual_clock=True)
+
+    def _usNow():
+        return time.perf_counter_ns() // 1000
+
+    def _usDiff(end, start):
+        return end - start
+else:
+    _usNow = time.ticks_us
+    _usDiff = time.ticks_diff
+
+from iono_d16 import Iono
+from iono_d16.spi import Spi
+
+# Allowed increase with respect to the baseline: (relative, absolute)
+TOLERANCE = {
+    'frames': (0, 0.01),
+    'mutex': (0, 0.01),
+    'heap': (0.25, 16),
+    'us': (1.0, 20),
+}
+
+class _CountingLock:
+    def __init__(self, lock):
+        self._lock = lock
+        self.count = 0
+
+    def acquire(self, *args):
+        self.count += 1
+        return self._lock.acquire(*args)
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.count += 1
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+class _Counters:
+    frames = 0
+
+def _instrument():
+    transfer = Spi.transfer
+
+    def countingTransfer(cs, frame):
+        _Counters.frames += 1
+        transfer(cs, frame)
+
+    Spi.transfer = countingTransfer
+    Spi.mutex = _CountingLock(Spi.mutex)
+
+def _heapCall(fn, i):
+    if _HOST:
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        fn(i)
+        return tracemalloc.get_traced_memory()[1] - start
+    a = gc.mem_alloc()
+    fn(i)
+    return gc.mem_alloc() - a
+
+def measure(fn, n, pace_ms=0):
+    # Calls fn(i) n times, sleeping pace_ms between the calls, and returns
+    # the per call costs
+    frames = _Counters.frames
+    mutex = Spi.mutex.count
+    us = 0
+    usMax = 0
+    for i in range(n):
+        t = _usNow()
+        fn(i)
+        dt = _usDiff(_usNow(), t)
+        us += dt
+        if dt > usMax:
+            usMax = dt
+        if pace_ms:
+            time.sleep_ms(pace_ms)
+    frames = _Counters.frames - frames
+    mutex = Spi.mutex.count - mutex
+
+    # Separate pass for the heap, not to affect the timing
+    heap = 0
+    gc.collect()
+    if _HOST:
+        tracemalloc.start()
+    else:
+        gc.disable()
+    try:
+        for i in range(n):
+            h = _heapCall(fn, i)
+            if _HOST:
+                heap = max(heap, h)
+            else:
+                heap += h
+            if pace_ms:
+                time.sleep_ms(pace_ms)
+    finally:
+        if _HOST:
+            tracemalloc.stop()
+        else:
+            gc.enable()
+    if not _HOST:
+        heap = heap / n
+
+    return {
+        'frames': round(frames / n, 2),
+        'mutex': round(mutex / n, 2),
+        'heap': round(heap, 1),
+        'us': round(us / n, 1),
+        'us_max': usMax,
+    }
+
+def _process(i):
+    Iono.process()
+
+def _scan(i):
+    # Iteration of the Iono.run_scan() loop
+    Iono._scan()
+
+def _valueWrite(i):
+    Iono.D1.value(i & 1)
+
+def _valueRead(i):
+    Iono.D2.value()
+
+def _init(i):
+    Iono.D1.init(Iono.PIN_MODE_OUT_PP if i & 1 else Iono.PIN_MODE_IN)
+
+def _statusDump(i):
+    # As in example.py, without printing
+    for pin in Iono.d_pins():
+        "{} = {}\tWB = {}\tOL = {}\tOV = {}\tOVL = {}\tTS = {}\tTSL = {}\tAT1 = {}\tAT2 = {}".format(
+                pin.name(),
+                pin.value(),
+                pin.wire_break(),
+                pin.open_load(),
+                pin.over_voltage(),
+                pin.over_voltage_lock(),
+                pin.thermal_shutdown(),
+                pin.thermal_shutdown_lock(),
+                pin.alarm_t1(),
+                pin.alarm_t2()
+            )
+
+_faultsBuf = array('I', [0] * 9)
+
+def _faults(i):
+    Iono.faults(_faultsBuf, True)
+
+# (name, function, calls, pause between calls in ms)
+SCENARIOS = (
+    ('process', _process, 200, 1),
+    ('scan', _scan, 200, 0),
+    ('value_write', _valueWrite, 100, 0),
+    ('value_read', _valueRead, 100, 0),
+    ('init', _init, 20, 0),
+    ('status_dump', _statusDump, 10, 0),
+    ('faults', _faults, 100, 0),
+)
+
+def run():
+    if not Iono.ready():
+        Iono.init()
+    _instrument()
+    Iono.D1.init(Iono.PIN_MODE_OUT_PP)
+    Iono.D2.init(Iono.PIN_MODE_IN)
+    results = {}
+    for name, fn, n, pace in SCENARIOS:
+        fn(0)
+        results[name] = measure(fn, n, pace)
+    return {
+        'platform': 'host' if _HOST else sys.platform,
+        'results': results,
+    }
+
+def compare(report, baseline):
+    # Returns the list of regressions with respect to the baseline
+    ret = []
+    if report['platform'] != baseline['platform']:
+        return ['platform {} != baseline {}'.format(
+                    report['platform'], baseline['platform'])]
+    for name, res in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for key, (rel, ab) in TOLERANCE.items():
+            if key in base and res[key] > base[key] * (1 + rel) + ab:
+                ret.append('{} {}: {} > baseline {}'.format(
+                            name, key, res[key], base[key]))
+    return ret
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+def main(baseline='bench_baseline.json', out=None, update=False,
+            time_check=not _HOST):
+    # The host execution times depend on the load of the machine, they
+    # are compared only on request
+    report = run()
+    data = json.dumps(report)
+    print(data)
+    if out is not None:
+        with open(out, 'w') as f:
+            f.write(data)
+    if update:
+        with open(baseline, 'w') as f:
+            f.write(data)
+        return True
+    base = _load(baseline)
+    if base is None:
+        print('No baseline', baseline)
+        return True
+    if not time_check:
+        for res in base['results'].values():
+            res.pop('us', None)
+    regressions = compare(report, base)
+    for r in regressions:
+        print('REGRESSION', r)
+    return not regressions
+
+if _HOST and __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Iono RP D16 benchmarks')
+    parser.add_argument('--baseline',
+            default=os.path.join(_ROOT, 'bench', 'baseline_host.json'))
+    parser.add_argument('--out')
+    parser.add_argument('--update', action='store_true',
+            help='store the results as the new baseline')
+    parser.add_argument('--time', action='store_true',
+            help='compare the execution times too')
+    args = parser.parse_args()
+    ok = main(args.baseline, args.out, args.update, args.time)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,84 @@
+'''
+Iono RP D16 benchmarks
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Boot cost: time and heap of "from iono_d16 import Iono", of Iono.init()
+# and of the first access to a D pin, to be run right after a reset.
+#
+# On the device, copy this file to the root of the filesystem, then press
+# Ctrl-D in the REPL for a soft reset and run:
+#   import boot_bench
+# (renamed, as boot.py would run at every boot). The heap is measured with
+# gc.mem_free() after a gc.collect(), i.e. it is the memory retained.
+#
+# On the host, from the repository root:
+#   python3 bench/boot.py
+# where the heap is the memory traced by tracemalloc.
+
+import sys
+import gc
+import json
+import time
+
+_HOST = sys.implementation.name != 'micropython'
+
+if _HOST:
+    import os
+    _ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [os.path.join(_ROOT, 'host'), os.path.join(_ROOT, 'lib')]
+    import tracemalloc
+    import iono_sim
+    iono_sim.install()
+    tracemalloc.start()
+
+    def _usNow():
+        return time.perf_counter_ns() // 1000
+
+    def _heapUsed():
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+else:
+    def _usNow():
+        return time.ticks_us()
+
+    def _heapUsed():
+        gc.collect()
+        return gc.mem_alloc()
+
+def _step(report, name, fn):
+    heap = _heapUsed()
+    t = _usNow()
+    ret = fn()
+    us = _usNow() - t if _HOST else time.ticks_diff(_usNow(), t)
+    report[name] = {'us': us, 'heap': _heapUsed() - heap}
+    return ret
+
+def _import():
+    from iono_d16 import Iono
+    return Iono
+
+def main():
+    report = {'platform': 'host' if _HOST else sys.platform}
+    if not _HOST:
+        report['mem_free_start'] = gc.mem_free()
+    Iono = _step(report, 'import', _import)
+    _step(report, 'init', Iono.init)
+    _step(report, 'first_pin', lambda: Iono.D1.init(Iono.PIN_MODE_IN))
+    if not _HOST:
+        gc.collect()
+        report['mem_free_end'] = gc.mem_free()
+    print(json.dumps(report))
+    return report
+
+main()
@@ -85,6 +85,7 @@ print("I/O setup done.")
 # Init RS-485 interface
 Iono.RS485.init(9600, bits=8, parity=None, stop=1, timeout=0, timeout_char=50)
 Iono.RS485.txen(False)
+rxBuf = bytearray(256)
 
 flip = True
 
@@ -111,19 +112,23 @@ while True:
 
     time.sleep_ms(10)
 
-    for pin in Iono.d_pins():
+    # All the fault states as 16-bit words, bit 0 = D1 ... bit 15 = D16,
+    # cleared once read
+    f = Iono.faults(clear=True)
+    pins = Iono.d_pins()
+    for i in range(16):
         print(
             "{} = {}\tWB = {}\tOL = {}\tOV = {}\tOVL = {}\tTS = {}\tTSL = {}\tAT1 = {}\tAT2 = {}".format(
-                    pin.name(),
-                    pin.value(),
-                    pin.wire_break(),
-                    pin.open_load(),
-                    pin.over_voltage(),
-                    pin.over_voltage_lock(),
-                    pin.thermal_shutdown(),
-                    pin.thermal_shutdown_lock(),
-                    pin.alarm_t1(),
-                    pin.alarm_t2()
+                    pins[i].name(),
+                    pins[i].value(),
+                    (f[Iono.FAULT_WB] >> i) & 1,
+                    (f[Iono.FAULT_OL] >> i) & 1,
+                    (f[Iono.FAULT_OV] >> i) & 1,
+                    (f[Iono.FAULT_OV_LOCK] >> i) & 1,
+                    (f[Iono.FAULT_THSD] >> i) & 1,
+                    (f[Iono.FAULT_THSD_LOCK] >> i) & 1,
+                    (f[Iono.FAULT_ALRM_T1] >> i) & 1,
+                    (f[Iono.FAULT_ALRM_T2] >> i) & 1
                 )
             )
 
@@ -131,11 +136,9 @@ while True:
     print("DT2 =", Iono.DT2.value())
 
     # Check RS-485 for incoming data
-    line = Iono.RS485.readline()
-    if line:
-        # If available, echo it back
-        # driving the TX-enble line
-        Iono.RS485.txen(True)
-        Iono.RS485.write("Echo: ")
-        Iono.RS485.write(line)
-        Iono.RS485.txen(False)
+    n = Iono.RS485.recv(rxBuf)
+    if n > 0:
+        # If available, echo it back,
+        # send() drives the TX-enable line
+        Iono.RS485.send(b"Echo: ")
+        Iono.RS485.send(rxBuf, n)
@@ -0,0 +1,49 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# pytest fixtures of the host tests, run from the repository root with:
+#   python3 -m pytest host
+
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'host'), os.path.join(_ROOT, 'lib')]
+
+import pytest
+import iono_sim
+
+iono_sim.install(virtual_clock=True)
+
+class Sim:
+    def __init__(self):
+        self.board = iono_sim.reset()
+        from iono_d16 import Iono
+        self.iono = Iono
+        assert Iono.init()
+
+    def run(self, ms):
+        # Calls Iono.process() every ms for the given time, returns the
+        # number of SPI frames transferred meanwhile
+        frames = self.board.spiFrames
+        for i in range(ms):
+            self.iono.process()
+            iono_sim.advance(1000)
+        return self.board.spiFrames - frames
+
+@pytest.fixture
+def sim():
+    # Simulated board with a freshly imported and initialized library
+    return Sim()
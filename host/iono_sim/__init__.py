@@ -0,0 +1,110 @@
+'''
+Iono RP D16 host simulator
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Host-side simulator of Iono RP D16: runs the iono_d16 library on CPython
+# against register-level models of the MAX14912 and MAX22190 chips.
+#
+#   import iono_sim
+#   iono_sim.install()
+#   from iono_d16 import Iono
+#
+# with the host/ and lib/ directories in the module search path.
+
+import builtins
+import sys
+import time
+from iono_sim import loader
+from iono_sim.board import Board
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+_board = None
+_virtualUs = None
+
+def board():
+    global _board
+    if _board is None:
+        _board = Board()
+    return _board
+
+def reset():
+    # Discards the board and the imported iono_d16 modules, so that the
+    # next import starts the library from scratch, e.g. between tests
+    global _board
+    _board = None
+    for name in list(sys.modules):
+        if name == loader.PACKAGE or name.startswith(loader.PACKAGE + '.'):
+            del sys.modules[name]
+    return board()
+
+def _nowUs():
+    if _virtualUs is not None:
+        return _virtualUs
+    return time.perf_counter_ns() // 1000
+
+def advance(us):
+    # Advances the virtual clock, see install()
+    global _virtualUs
+    if _virtualUs is None:
+        raise RuntimeError('virtual clock not enabled')
+    _virtualUs += us
+
+def _ticks_ms():
+    return (_nowUs() // 1000) & _TICKS_MAX
+
+def _ticks_us():
+    return _nowUs() & _TICKS_MAX
+
+def _ticks_cpu():
+    return _nowUs() & _TICKS_MAX
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+def _ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALFPERIOD) & _TICKS_MAX) \
+                - _TICKS_HALFPERIOD
+
+def _sleep_us(us):
+    if _virtualUs is not None:
+        advance(max(us, 0))
+    elif us > 0:
+        _sleep(us / 1000000)
+
+def _sleep_ms(ms):
+    _sleep_us(ms * 1000)
+
+_sleep = time.sleep
+
+def install(virtual_clock=False):
+    # Patches the time module with the MicroPython ticks functions, makes
+    # const() a builtin and registers the import hook for iono_d16.
+    # With virtual_clock the time only moves with advance() and the
+    # sleep functions, for deterministic runs
+    global _virtualUs
+    if virtual_clock and _virtualUs is None:
+        _virtualUs = 0
+    time.ticks_ms = _ticks_ms
+    time.ticks_us = _ticks_us
+    time.ticks_cpu = _ticks_cpu
+    time.ticks_add = _ticks_add
+    time.ticks_diff = _ticks_diff
+    time.sleep_ms = _sleep_ms
+    time.sleep_us = _sleep_us
+    builtins.const = lambda expr: expr
+    loader.install()
+    return board()
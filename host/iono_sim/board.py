@@ -0,0 +1,263 @@
+'''
+Iono RP D16 host simulator
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+import random
+import threading
+from iono_sim.chips import Max14912Model, Max22190Model
+
+PIN_CS_DOH = 5
+PIN_CS_DOL = 6
+PIN_CS_DIH = 7
+PIN_CS_DIL = 8
+PIN_RS485_TXEN_N = 14
+
+class UartPort:
+    def __init__(self, board, id):
+        self._board = board
+        self.id = id
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._lock = threading.Lock()
+        self.baudrate = 9600
+        self.bits = 8
+        self.parity = None
+        self.stop = 1
+        # Bytes written while the RS-485 transmitter was disabled
+        self.txDisabled = 0
+        # Called with the written bytes, e.g. to reply as a remote device
+        self.on_tx = None
+
+    def configure(self, baudrate, bits, parity, stop):
+        self.baudrate = baudrate
+        self.bits = bits
+        self.parity = parity
+        self.stop = stop
+
+    def feed(self, data):
+        # Bytes received by the device
+        with self._lock:
+            self._rx.extend(data)
+
+    def take(self):
+        # Bytes sent by the device since the previous call
+        with self._lock:
+            data = bytes(self._tx)
+            self._tx.clear()
+        return data
+
+    def rx_available(self):
+        return len(self._rx)
+
+    def rx_take(self, n=None):
+        with self._lock:
+            if n is None:
+                n = len(self._rx)
+            data = bytes(self._rx[:n])
+            del self._rx[:n]
+        return data
+
+    def rx_take_line(self):
+        with self._lock:
+            i = self._rx.find(b'\n')
+            n = len(self._rx) if i < 0 else i + 1
+            data = bytes(self._rx[:n])
+            del self._rx[:n]
+        return data
+
+    def tx_put(self, data):
+        if self.id == 0 and self._board.pin_level(PIN_RS485_TXEN_N):
+            self.txDisabled += len(data)
+        with self._lock:
+            self._tx.extend(data)
+        if self.on_tx is not None:
+            self.on_tx(data)
+        return len(data)
+
+class Board:
+    def __init__(self):
+        self._pins = {}
+        self._levels = {}
+        self._uarts = {}
+        self.dol = Max14912Model('DOL')
+        self.doh = Max14912Model('DOH')
+        self.dil = Max22190Model('DIL')
+        self.dih = Max22190Model('DIH')
+        self._chips = {
+            PIN_CS_DOL: self.dol,
+            PIN_CS_DOH: self.doh,
+            PIN_CS_DIL: self.dil,
+            PIN_CS_DIH: self.dih,
+        }
+        self.reset()
+
+    def reset(self):
+        for chip in self._chips.values():
+            chip.reset()
+        # External levels applied to D1..D16, bit n-1 = Dn
+        self._dIn = 0
+        self.led = False
+        self.spiFrames = 0
+        self._corruptRx = 0
+        self._corruptTx = 0
+        self._corruptChip = None
+        self._corruptRate = 0
+        self._rand = random.Random(0)
+
+    # Pins
+
+    def pin_register(self, pin):
+        self._pins.setdefault(pin.id(), []).append(pin)
+        self._levels.setdefault(pin.id(), 0)
+
+    def pin_level(self, id):
+        return self._levels.get(id, 0)
+
+    def pin_set(self, id, level):
+        prev = self._levels.get(id, 0)
+        self._levels[id] = level
+        if prev != level and id not in self._chips:
+            for pin in self._pins.get(id, ()):
+                if pin._handler is not None and (pin._trigger &
+                        (pin.IRQ_RISING if level else pin.IRQ_FALLING)):
+                    pin._handler(pin)
+
+    # SPI bus
+
+    def spi_transfer(self, data):
+        selected = [cs for cs in self._chips if self._levels.get(cs, 1) == 0]
+        if len(selected) != 1:
+            # Both input chips selected is the LED latch clock, with the
+            # LED state on the DOL chip select line
+            if (PIN_CS_DIL in selected) and (PIN_CS_DIH in selected):
+                self.led = self._levels.get(PIN_CS_DOL, 1) == 0
+            return bytes(len(data))
+        chip = self._chips[selected[0]]
+        self._updateInputs()
+        self.spiFrames += 1
+        corruptTx, corruptRx = self._corrupt(chip)
+        return chip.frame(data, corruptTx, corruptRx)
+
+    def _corrupt(self, chip):
+        if self._corruptChip is not None and self._corruptChip is not chip:
+            return False, False
+        tx = rx = False
+        if self._corruptTx > 0:
+            self._corruptTx -= 1
+            tx = True
+        elif self._corruptRx > 0:
+            self._corruptRx -= 1
+            rx = True
+        elif self._corruptRate and self._rand.random() < self._corruptRate:
+            rx = True
+        return tx, rx
+
+    def corrupt(self, count=1, chip=None, tx=False):
+        # Corrupts the next count frames, the ones sent to the chip if
+        # tx is True, otherwise the replies. chip is one of 'DOL', 'DOH',
+        # 'DIL', 'DIH', or None for any
+        self._corruptChip = None if chip is None else self.chip(chip)
+        if tx:
+            self._corruptTx = count
+        else:
+            self._corruptRx = count
+
+    def corrupt_rate(self, rate, seed=0, chip=None):
+        # Corrupts the replies randomly with the given probability
+        self._corruptChip = None if chip is None else self.chip(chip)
+        self._corruptRate = rate
+        self._rand = random.Random(seed)
+
+    def chip(self, name):
+        return getattr(self, name.lower())
+
+    # D1..D16
+
+    def _dChips(self, num):
+        if num < 1 or num > 16:
+            raise ValueError('D{}'.format(num))
+        if num <= 8:
+            return self.dil, self.dol, (16 - num) % 8, (num - 1) % 8
+        return self.dih, self.doh, (16 - num) % 8, (num - 1) % 8
+
+    def _updateInputs(self):
+        # A pin driven by its output reads high regardless of the
+        # external level
+        word = self._dIn | self.outputs()
+        for chip, base in ((self.dil, 0), (self.dih, 8)):
+            v = 0
+            for i in range(8):
+                if word & (1 << (base + i)):
+                    v |= 1 << ((7 - i) % 8)
+            chip.inputs = v
+
+    def set_input(self, num, value):
+        if value:
+            self._dIn |= 1 << (num - 1)
+        else:
+            self._dIn &= ~(1 << (num - 1))
+
+    def set_inputs(self, word):
+        self._dIn = word & 0xffff
+
+    def output(self, num):
+        inChip, outChip, inIdx, outIdx = self._dChips(num)
+        return (outChip.outputs() >> outIdx) & 1
+
+    def outputs(self):
+        # Driven levels of D1..D16, bit n-1 = Dn
+        return self.dol.outputs() | (self.doh.outputs() << 8)
+
+    def input_filter(self, num):
+        inChip, outChip, inIdx, outIdx = self._dChips(num)
+        return inChip.filter(inIdx)
+
+    def inject(self, fault, num=None, active=True):
+        # fault: 'ov', 'thsd', 'ol', 'wb' on Dnum, or 'alarm_t1',
+        # 'alarm_t2', 'otshdn' on the input chip of Dnum (both if None)
+        if fault in ('alarm_t1', 'alarm_t2', 'otshdn'):
+            attr = {'alarm_t1': 'alarmT1', 'alarm_t2': 'alarmT2',
+                    'otshdn': 'otshdn'}[fault]
+            chips = (self.dil, self.dih) if num is None \
+                        else (self._dChips(num)[0],)
+            for chip in chips:
+                setattr(chip, attr, active)
+            return
+        if fault not in ('ov', 'thsd', 'ol', 'wb'):
+            raise ValueError(fault)
+        inChip, outChip, inIdx, outIdx = self._dChips(num)
+        if fault == 'wb':
+            chip, bit = inChip, 1 << inIdx
+        else:
+            chip, bit = outChip, 1 << outIdx
+        v = getattr(chip, fault)
+        setattr(chip, fault, (v | bit) if active else (v & ~bit))
+
+    def clear_faults(self):
+        for chip in (self.dol, self.doh):
+            chip.ov = chip.thsd = chip.ol = 0
+        for chip in (self.dil, self.dih):
+            chip.wb = 0
+            chip.alarmT1 = chip.alarmT2 = chip.otshdn = False
+
+    def crc_errors(self):
+        # CRC errors detected by the chips on the received commands
+        return {c.name: c.crcErrors for c in self._chips.values()}
+
+    # UART
+
+    def uart(self, id):
+        if id not in self._uarts:
+            self._uarts[id] = UartPort(self, id)
+        return self._uarts[id]
@@ -0,0 +1,209 @@
+'''
+Iono RP D16 host simulator
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Register-level models of the MAX14912 and MAX22190 as seen from the
+# SPI bus. CRCs are computed bit by bit, independently of the library's
+# table driven implementation, so that the two cross-check each other.
+
+def crc14912(byte1, byte2):
+    def loop(crc, byte):
+        for i in range(8):
+            crc <<= 1
+            if crc & 0x80:
+                crc ^= 0xB7
+            if byte & 0x80:
+                crc ^= 1
+            byte <<= 1
+        return crc
+    return loop(loop(loop(0x7f, byte1), byte2), 0x80) & 0x7f
+
+def crc22190(data2, data1, data0):
+    data = (((data2 << 16) | (data1 << 8) | data0) & 0xffffe0) | 0x07
+    crc = data >> 18
+    if crc & 0x20:
+        crc ^= 0x35
+    for i in range(18):
+        crc = ((crc & 0x1f) << 1) | ((data >> (17 - i)) & 1)
+        if crc & 0x20:
+            crc ^= 0x35
+    return crc & 0x1f
+
+class Max14912Model:
+    FRAME_LEN = 3
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.state = 0
+        self.pp = 0
+        self.olEn = 0
+        self.config = 0
+        # Injected real-time faults, one bit per output
+        self.ov = 0
+        self.thsd = 0
+        self.ol = 0
+        self._olLatch = 0
+        self._thsdLatch = 0
+        self._ovLatch = 0
+        self._reply = (0, 0)
+        self._crcErr = False
+        self.frames = 0
+        self.crcErrors = 0
+
+    def outputs(self):
+        # Levels actually driven: outputs in thermal shutdown are off
+        return self.state & ~self.thsd & 0xff
+
+    def _latch(self):
+        self._olLatch |= self.ol & self.olEn
+        self._thsdLatch |= self.thsd
+        self._ovLatch |= self.ov
+
+    def _register(self, addr):
+        self._latch()
+        if addr == 0:
+            return (0, self.state)
+        if addr == 1:
+            return (0, self.pp)
+        if addr == 2:
+            return (0, self.olEn)
+        if addr == 3:
+            return (0, self.config)
+        if addr == 4:
+            return (self.ol & self.olEn, self._olLatch)
+        if addr == 5:
+            return (self.thsd, self._thsdLatch)
+        if addr == 6:
+            return (0, (1 if self._olLatch else 0)
+                    | (2 if self._thsdLatch else 0)
+                    | (4 if self._ovLatch else 0))
+        if addr == 7:
+            return (self.ov, self._ovLatch)
+        return (0, 0)
+
+    def _rtStatus(self):
+        self._latch()
+        return (self.ov | self.thsd | (self.ol & self.olEn), self.state)
+
+    def frame(self, tx, corruptTx=False, corruptRx=False):
+        self.frames += 1
+        b1, b2, crc = tx[0], tx[1], tx[2]
+        if corruptTx:
+            b2 ^= 0x01
+        # The reply is shifted out while the command is shifted in: it
+        # carries the result of the previous command and its CRC status
+        r1, r0 = self._reply
+        rcrc = crc14912(r1, r0) | (0x80 if self._crcErr else 0)
+        if corruptRx:
+            rcrc ^= 0x01
+        self._crcErr = (crc & 0x7f) != crc14912(b1, b2)
+        if self._crcErr:
+            self.crcErrors += 1
+        else:
+            self._command(b1, b2)
+        return bytes((r1, r0, rcrc))
+
+    def _command(self, b1, b2):
+        if b1 & 0x80:
+            self._olLatch = 0
+            self._thsdLatch = 0
+            self._ovLatch = 0
+        cmd = b1 & 0x7f
+        if cmd == 0b0:
+            self.state = b2
+        elif cmd == 0b1:
+            self.pp = b2
+        elif cmd == 0b10:
+            self.olEn = b2
+        elif cmd == 0b11:
+            self.config = b2
+        if cmd == 0b100000:
+            self._reply = self._register(b2 & 0x07)
+        else:
+            self._reply = self._rtStatus()
+
+class Max22190Model:
+    FRAME_LEN = 3
+
+    _REG_WB = 0x00
+    _REG_FAULT1 = 0x04
+    _REG_FLT1 = 0x06
+    _REG_FAULT2 = 0x1C
+    _REG_FAULT2EN = 0x1E
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.regs = bytearray(0x20)
+        self.regs[self._REG_FAULT2EN] = 0x3f
+        # Input levels, bit n = IN(n+1) of the chip, as in the first reply
+        # byte
+        self.inputs = 0
+        # Injected faults: wire break per input, temperature alarms and
+        # over-temperature shutdown
+        self.wb = 0
+        self.alarmT1 = False
+        self.alarmT2 = False
+        self.otshdn = False
+        self._crcErr = False
+        self.frames = 0
+        self.crcErrors = 0
+
+    def filter(self, idx):
+        return self.regs[self._REG_FLT1 + idx * 2]
+
+    def _register(self, addr):
+        if addr == self._REG_WB:
+            v = 0
+            for i in range(8):
+                if (self.wb & (1 << i)) and (self.filter(i) & 0x10):
+                    v |= 1 << i
+            return v
+        if addr == self._REG_FAULT1:
+            fault2 = self._register(self._REG_FAULT2)
+            return ((0x08 if self.alarmT1 else 0)
+                    | (0x10 if self.alarmT2 else 0)
+                    | (0x20 if fault2 else 0)
+                    | (0x80 if self._crcErr else 0))
+        if addr == self._REG_FAULT2:
+            return (0x10 if self.otshdn else 0) & self.regs[self._REG_FAULT2EN]
+        return self.regs[addr]
+
+    def frame(self, tx, corruptTx=False, corruptRx=False):
+        self.frames += 1
+        b1, b2, b3 = tx[0], tx[1], tx[2]
+        if corruptTx:
+            b2 ^= 0x01
+        data = 0
+        if (b3 & 0x1f) != crc22190(b1, b2, b3):
+            self._crcErr = True
+            self.crcErrors += 1
+        else:
+            addr = b1 & 0x1f
+            if b1 & 0x80:
+                self.regs[addr] = b2
+            else:
+                data = self._register(addr)
+                if addr == self._REG_FAULT1:
+                    self._crcErr = False
+        r1 = self.inputs & 0xff
+        rcrc = crc22190(r1, data, 0)
+        if corruptRx:
+            rcrc ^= 0x01
+        return bytes((r1, data, rcrc))
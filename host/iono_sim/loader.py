@@ -0,0 +1,68 @@
+'''
+Iono RP D16 host simulator
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Import hook running the iono_d16 modules on CPython.
+# MicroPython substitutes the names assigned with const() at compile time,
+# so the library references constants defined in class bodies as bare
+# names. The hook collects every NAME = const(...) assignment of a module
+# and injects them as module globals before executing it.
+
+import ast
+import sys
+from importlib.abc import MetaPathFinder
+from importlib.machinery import PathFinder, SourceFileLoader
+
+PACKAGE = 'iono_d16'
+
+def consts(source, filename='<string>'):
+    ret = {}
+    for node in ast.walk(ast.parse(source, filename)):
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Name)
+                and node.value.func.id == 'const'
+                and len(node.value.args) == 1):
+            continue
+        name = node.targets[0].id
+        expr = ast.Expression(node.value.args[0])
+        value = eval(compile(expr, filename, 'eval'), {}, dict(ret))
+        if name in ret and ret[name] != value:
+            raise ImportError('{}: const {} redefined with a different value'
+                                .format(filename, name))
+        ret[name] = value
+    return ret
+
+class ConstLoader(SourceFileLoader):
+    def exec_module(self, module):
+        source = self.get_data(self.path).decode('utf-8')
+        module.__dict__.update(consts(source, self.path))
+        super().exec_module(module)
+
+class ConstFinder(MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if fullname != PACKAGE and not fullname.startswith(PACKAGE + '.'):
+            return None
+        spec = PathFinder.find_spec(fullname, path)
+        if spec is None or not isinstance(spec.loader, SourceFileLoader):
+            return spec
+        spec.loader = ConstLoader(fullname, spec.origin)
+        return spec
+
+def install():
+    for finder in sys.meta_path:
+        if isinstance(finder, ConstFinder):
+            return
+    sys.meta_path.insert(0, ConstFinder())
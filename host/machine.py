@@ -0,0 +1,208 @@
+'''
+Iono RP D16 host simulator
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Stand-in of the MicroPython machine module for CPython, backed by the
+# simulated board of the iono_sim package
+
+import threading
+import iono_sim
+
+def _board():
+    return iono_sim.board()
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self._id = id
+        self._mode = None
+        self._handler = None
+        self._trigger = 0
+        _board().pin_register(self)
+        # Not self.init(), which subclasses may override
+        Pin.init(self, mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode is not None and mode != -1:
+            self._mode = mode
+        if value is not None:
+            self.value(value)
+
+    def id(self):
+        return self._id
+
+    def value(self, x=None):
+        if x is None:
+            return _board().pin_level(self._id)
+        _board().pin_set(self._id, 1 if x else 0)
+
+    def __call__(self, x=None):
+        return self.value(x)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def low(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def toggle(self):
+        self.value(not self.value())
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def __repr__(self):
+        return 'Pin(GPIO{})'.format(self._id)
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1000000, **kwargs):
+        self._id = id
+        self._baudrate = baudrate
+
+    def init(self, baudrate=1000000, **kwargs):
+        self._baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write_readinto(self, write_buf, read_buf):
+        data = _board().spi_transfer(bytes(write_buf))
+        for i in range(len(data)):
+            read_buf[i] = data[i]
+
+    def write(self, buf):
+        _board().spi_transfer(bytes(buf))
+
+    def read(self, nbytes, write=0x00):
+        return _board().spi_transfer(bytes([write] * nbytes))
+
+    def readinto(self, buf, write=0x00):
+        self.write_readinto(bytes([write] * len(buf)), buf)
+
+class UART:
+    INV_TX = 1
+    INV_RX = 2
+    IRQ_RXIDLE = 4
+    IRQ_TXIDLE = 8
+
+    def __init__(self, id, baudrate=9600, **kwargs):
+        self._port = _board().uart(id)
+        self.init(baudrate, **kwargs)
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, **kwargs):
+        self._port.configure(baudrate, bits, parity, stop)
+
+    def deinit(self):
+        pass
+
+    def any(self):
+        return self._port.rx_available()
+
+    def read(self, nbytes=None):
+        data = self._port.rx_take(nbytes)
+        return data if data else None
+
+    def readinto(self, buf, nbytes=None):
+        if nbytes is None:
+            nbytes = len(buf)
+        data = self._port.rx_take(nbytes)
+        if not data:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def readline(self):
+        data = self._port.rx_take_line()
+        return data if data else None
+
+    def write(self, buf, off=None, sz=None):
+        # As the MicroPython streams: write(buf[, max_len]) or
+        # write(buf, off, max_len)
+        if sz is not None:
+            buf = bytes(buf)[off:off + sz]
+        elif off is not None:
+            buf = bytes(buf)[:off]
+        return self._port.tx_put(bytes(buf))
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+    def sendbreak(self):
+        pass
+
+    def irq(self, handler=None, trigger=0, hard=False):
+        pass
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._thread = None
+        self._stop = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self.deinit()
+        if freq > 0:
+            interval = 1 / freq
+        else:
+            interval = period / 1000
+        stop = threading.Event()
+        self._stop = stop
+
+        def run():
+            while not stop.wait(interval):
+                callback(self)
+                if mode == Timer.ONE_SHOT:
+                    break
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def deinit(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+            self._thread = None
+
+def freq(hz=None):
+    return 125000000
+
+def unique_id():
+    return b'\x00' * 8
+
+def reset():
+    raise SystemExit('machine.reset()')
@@ -0,0 +1,34 @@
+'''
+Iono RP D16 host simulator
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Stand-in of the MicroPython micropython module for CPython.
+# The native code emitters (micropython.native, micropython.viper) are
+# intentionally not provided, so that the library falls back to its plain
+# Python implementations.
+
+def const(expr):
+    return expr
+
+def schedule(func, arg):
+    func(arg)
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+def mem_info(verbose=None):
+    pass
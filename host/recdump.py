@@ -0,0 +1,60 @@
+'''
+Iono RP D16 recording decoder
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Decodes a recording exported with Recorder.dump(), from a file or as
+# received from the RS-485 port, into CSV lines:
+#   python3 host/recdump.py [--pins] rec.bin > rec.csv
+#
+# Columns: time in us since the first sample, D inputs word (bit 0 = D1),
+# DT pins (bit 0 = DT1), 1 on the trigger sample. With --pins the inputs
+# are split in one column per pin.
+
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(_ROOT, 'host'), os.path.join(_ROOT, 'lib')]
+
+import iono_sim
+iono_sim.install()
+
+from iono_d16.recorder import Recorder
+
+def main(path, pins=False, out=sys.stdout):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if pins:
+        cols = ['D%d' % n for n in range(1, 17)] + \
+                ['DT%d' % n for n in range(1, 5)]
+    else:
+        cols = ['inputs', 'dt']
+    out.write(','.join(['us'] + cols + ['trigger']) + '\n')
+    for us, inputs, dt, trig in Recorder.decode(data):
+        if pins:
+            vals = [(inputs >> i) & 1 for i in range(16)] + \
+                    [(dt >> i) & 1 for i in range(4)]
+        else:
+            vals = ['0x%04x' % inputs, '0x%x' % dt]
+        out.write(','.join(str(v) for v in [us] + vals + [trig]) + '\n')
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+            description='Iono RP D16 recording decoder')
+    parser.add_argument('file')
+    parser.add_argument('--pins', action='store_true',
+            help='one column per pin')
+    args = parser.parse_args()
+    main(args.file, args.pins)
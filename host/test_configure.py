@@ -0,0 +1,123 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Bulk configuration with Iono.configure()
+
+from conftest import Sim
+
+def _spec(Iono):
+    spec = {
+        1: Iono.PIN_MODE_OUT_PP,
+        2: (Iono.PIN_MODE_OUT_HS, True),
+        3: (Iono.PIN_MODE_IN, True, Iono.FLT_DELAY_800US),
+        4: Iono.PIN_MODE_OUT_PP,
+        5: Iono.PIN_MODE_OUT_HS,
+        6: Iono.PIN_MODE_OUT_HS,
+        7: Iono.PIN_MODE_IN,
+        8: Iono.PIN_MODE_IN,
+    }
+    for n in range(9, 17):
+        spec[n] = Iono.PIN_MODE_OUT_HS if n % 2 else (Iono.PIN_MODE_IN, True)
+    return spec
+
+def _registers(sim):
+    b = sim.board
+    return (b.dol.pp, b.dol.olEn, b.dol.config, b.doh.pp, b.doh.olEn,
+            b.doh.config, bytes(b.dil.regs), bytes(b.dih.regs),
+            sim.iono._maxOutL._cfgOut, sim.iono._maxOutH._cfgOut)
+
+def test_same_as_per_pin():
+    sim = Sim()
+    Iono = sim.iono
+    spec = _spec(Iono)
+    frames = sim.board.spiFrames
+    for n, s in spec.items():
+        if isinstance(s, int):
+            s = (s,)
+        assert getattr(Iono, 'D%d' % n).init(*s)
+    assert Iono.D5.joinPair()
+    perPin = sim.board.spiFrames - frames
+    regs = _registers(sim)
+
+    sim = Sim()
+    Iono = sim.iono
+    frames = sim.board.spiFrames
+    assert Iono.configure(_spec(Iono), joins=(5,))
+    bulk = sim.board.spiFrames - frames
+    assert _registers(sim) == regs
+    assert bulk * 5 < perPin
+    for n, s in _spec(Iono).items():
+        mode = s if isinstance(s, int) else s[0]
+        assert getattr(Iono, 'D%d' % n)._mode == mode
+
+def test_unchanged_not_written(sim):
+    Iono = sim.iono
+    assert Iono.configure(_spec(Iono), joins=(5,))
+    frames = sim.board.spiFrames
+    assert Iono.configure(_spec(Iono))
+    assert sim.board.spiFrames == frames
+    assert Iono.configure({}, joins=())
+    assert sim.board.dol.config & 0x0c == 0
+
+def test_invalid(sim):
+    Iono = sim.iono
+    frames = sim.board.spiFrames
+    assert not Iono.configure({17: Iono.PIN_MODE_IN})
+    assert not Iono.configure({1: (Iono.PIN_MODE_OUT_PP, True)})
+    assert not Iono.configure({1: Iono.PIN_MODE_IN}, joins=(1,))
+    assert sim.board.spiFrames == frames
+    assert Iono.D1._mode is None
+
+def test_filter_range(sim):
+    Iono = sim.iono
+    assert Iono.D3.init(Iono.PIN_MODE_IN, flt=Iono.FLT_BYPASS)
+    assert sim.board.input_filter(3) & 0x0f == Iono.FLT_BYPASS
+    frames = sim.board.spiFrames
+    for flt in (-1, 9, 0x13, 1.5):
+        assert not Iono.D3.filter(flt)
+        assert not Iono.D4.init(Iono.PIN_MODE_IN, flt=flt)
+    # Not cached for the next writes either
+    assert not Iono.D4.init(0, flt=Iono.FLT_DELAY_20MS)
+    assert sim.board.spiFrames == frames
+    assert Iono.D4.init(Iono.PIN_MODE_IN)
+    assert sim.board.input_filter(4) & 0x0f == Iono.FLT_DELAY_50US
+    assert sim.board.input_filter(3) & 0x0f == Iono.FLT_BYPASS
+
+def test_failure(sim):
+    Iono = sim.iono
+    sim.board.corrupt(3, chip='DOH')
+    assert not Iono.configure({11: Iono.PIN_MODE_OUT_PP,
+                               12: Iono.PIN_MODE_OUT_PP,
+                               3: Iono.PIN_MODE_OUT_PP})
+    # D9-D16 not configured, D1-D8 are
+    assert Iono.D11._mode is None
+    assert Iono._maxOutH._cfgOut == 0
+    assert not Iono.D11.pwm(100, 0x8000)
+    assert Iono.D3._mode == Iono.PIN_MODE_OUT_PP
+    assert Iono._maxOutL._cfgOut == 0x04
+    # Written again by the next call
+    assert Iono.configure({11: Iono.PIN_MODE_OUT_PP,
+                           12: Iono.PIN_MODE_OUT_PP})
+    assert sim.board.doh.pp == 0x0c
+    assert Iono.D11.on()
+    assert sim.board.output(11) == 1
+
+def test_filter_invalid(sim):
+    Iono = sim.iono
+    frames = sim.board.spiFrames
+    for flt in (-1, 9, 0x13, 1.5):
+        assert not Iono.configure({7: (Iono.PIN_MODE_IN, False, flt)})
+    assert sim.board.spiFrames == frames
+    assert Iono.configure({7: (Iono.PIN_MODE_IN, False, None)})
@@ -0,0 +1,43 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Pulse counters, frequency and on time of the inputs
+
+def test_count(sim):
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_IN)
+    Iono.D3.counter(Iono.COUNT_RISING, window_ms=1000)
+    for i in range(10):
+        sim.board.set_input(3, 1)
+        sim.run(20)
+        sim.board.set_input(3, 0)
+        sim.run(80)
+    assert Iono.D3.count() == 10
+    assert abs(Iono.D3.frequency() - 10) < 0.5
+    assert abs(Iono.D3.on_time_ms() - 200) <= 10
+
+def test_enable_after_idle(sim):
+    # The on time starts from the current state of the input, also after
+    # a time with no pin counting
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_IN)
+    Iono.D3.counter(Iono.COUNT_RISING)
+    Iono.D3.counter(0)
+    sim.board.set_input(3, 1)
+    sim.run(5000)
+    Iono.D3.counter(Iono.COUNT_RISING)
+    sim.run(1000)
+    assert abs(Iono.D3.on_time_ms() - 1000) <= 10
+    assert Iono.D3.count() == 0
@@ -0,0 +1,94 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Checks the table-driven CRCs of lib/iono_d16/crc.py against the bit by
+# bit functions they replaced, over the whole input space:
+#   python3 host/test_crc.py
+# or with pytest.
+
+import os
+import importlib.util
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded from its file, the iono_d16 package needs MicroPython
+_spec = importlib.util.spec_from_file_location('crc',
+            os.path.join(_ROOT, 'lib', 'iono_d16', 'crc.py'))
+crc = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(crc)
+
+# Max14912._crcLoop() and Max14912._crc() as they were before crc.py
+
+def _crcLoop(crc, byte1):
+    for i in range(8):
+        crc <<= 1
+        if crc & 0x80:
+            crc ^= 0xB7  # 0x37 with MSBit on purpose
+        if byte1 & 0x80:
+            crc ^= 1
+        byte1 <<= 1
+    return crc
+
+def _crc14912(byte1, byte2):
+    synd = _crcLoop(0x7f, byte1)
+    synd = _crcLoop(synd, byte2)
+    return _crcLoop(synd, 0x80) & 0x7f
+
+# Max22190._crc() as it was before crc.py
+
+def _crc22190(data2, data1, data0):
+    length = 19          # 19-bit data
+    crc_init = 0x07      # 5-bit init word, constant, 00111
+    crc_poly = 0x35      # 6-bit polynomial, constant, 110101
+    crc_step = 0
+    tmp = 0
+
+    datainput = (data2 << 16) + (data1 << 8) + data0
+    datainput = (datainput & 0xffffe0) + crc_init
+    tmp = ((datainput & 0xfc0000) >> 18) & 0xff
+    if tmp & 0x20 == 0x20:
+        crc_step = (tmp ^ crc_poly) & 0xff
+    else:
+        crc_step = tmp
+
+    for i in range(length - 1):
+        tmp = (((crc_step & 0x1f) << 1) + ((datainput >> (length - 2 - i)) & 0x01)) & 0xff
+        if tmp & 0x20 == 0x20:
+            crc_step = (tmp ^ crc_poly) & 0xff
+        else:
+            crc_step = tmp
+
+    return crc_step & 0x1f
+
+def test_crc14912():
+    # All the 16-bit frames
+    for b1 in range(256):
+        for b2 in range(256):
+            assert crc.crc14912(b1, b2) == _crc14912(b1, b2), (b1, b2)
+
+def test_crc22190():
+    # All the 19-bit frames, the 5 LSBits of the third byte are the CRC
+    for d2 in range(256):
+        for d1 in range(256):
+            for d0 in range(0, 256, 0x20):
+                ref = _crc22190(d2, d1, d0)
+                assert crc.crc22190(d2, d1, d0) == ref, (d2, d1, d0)
+                assert crc.crc22190(d2, d1, d0 | 0x1f) == ref, (d2, d1, d0)
+
+if __name__ == '__main__':
+    for name, fn in sorted(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(name, 'OK')
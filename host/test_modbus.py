@@ -0,0 +1,104 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Modbus RTU slave over the simulated RS-485 port
+
+import pytest
+import iono_sim
+
+def _crc16(data):
+    c = 0xffff
+    for b in data:
+        c ^= b
+        for i in range(8):
+            c = (c >> 1) ^ 0xa001 if c & 1 else c >> 1
+    return c
+
+class Master:
+    def __init__(self, sim):
+        from iono_d16.modbus import ModbusSlave
+        self.sim = sim
+        sim.iono.RS485.init(115200)
+        self.port = sim.board.uart(0)
+        self.slave = ModbusSlave(1)
+
+    def request(self, pdu, address=1):
+        # Sends the request, returns the reply PDU or None
+        frame = bytes([address]) + bytes(pdu)
+        crc = _crc16(frame)
+        self.port.feed(frame + bytes([crc & 0xff, crc >> 8]))
+        for i in range(20):
+            self.sim.iono.process()
+            self.slave.process()
+            iono_sim.advance(500)
+        reply = self.port.take()
+        if not reply:
+            return None
+        assert _crc16(reply) == 0
+        assert reply[0] == address
+        return reply[1:-2]
+
+@pytest.fixture
+def mb(sim):
+    Iono = sim.iono
+    Iono.D1.init(Iono.PIN_MODE_OUT_PP)
+    Iono.D2.init(Iono.PIN_MODE_OUT_HS)
+    Iono.D3.init(Iono.PIN_MODE_IN)
+    return Master(sim)
+
+def test_read_discrete_inputs(mb):
+    mb.sim.board.set_input(3, 1)
+    mb.sim.run(1)
+    assert mb.request([2, 0, 0, 0, 16]) == bytes([2, 2, 0x04, 0x00])
+
+def test_write_coil(mb):
+    assert mb.request([5, 0, 1, 0xff, 0]) == bytes([5, 0, 1, 0xff, 0])
+    assert mb.sim.board.outputs() == 0x0002
+    assert mb.request([1, 0, 0, 0, 3]) == bytes([1, 1, 0x02])
+
+def test_write_coils(mb):
+    assert mb.request([15, 0, 0, 0, 2, 1, 3]) == bytes([15, 0, 0, 0, 2])
+    assert mb.sim.board.outputs() == 0x0003
+
+def test_registers(mb):
+    assert mb.request([16, 0, 0, 0, 1, 2, 0, 1]) == bytes([16, 0, 0, 0, 1])
+    assert mb.sim.board.outputs() == 0x0001
+    assert mb.request([3, 0, 0, 0, 1]) == bytes([3, 2, 0, 1])
+    mb.sim.board.set_input(3, 1)
+    mb.sim.run(1)
+    # Inputs (outputs read back too) and outputs words
+    assert mb.request([4, 0, 0, 0, 2]) == bytes([4, 4, 0, 0x05, 0, 0x01])
+
+def test_exceptions(mb):
+    # Illegal function
+    assert mb.request([7, 0, 0, 0, 0]) == bytes([0x87, 1])
+    assert mb.request([0x2b, 0, 0, 0, 0]) == bytes([0xab, 1])
+    # Illegal data address
+    assert mb.request([1, 0, 15, 0, 2]) == bytes([0x81, 2])
+    assert mb.request([4, 0, 48, 0, 1]) == bytes([0x84, 2])
+    # Coils of pins not initialized as outputs
+    assert mb.request([5, 0, 2, 0xff, 0]) == bytes([0x85, 2])
+    assert mb.request([15, 0, 0, 0, 3, 1, 7]) == bytes([0x8f, 2])
+    assert mb.sim.board.outputs() == 0
+    # Illegal data value
+    assert mb.request([5, 0, 0, 0x12, 0x34]) == bytes([0x85, 3])
+    assert mb.request([1, 0, 0, 0, 0]) == bytes([0x81, 3])
+    assert mb.slave.stats()[3] == 8
+
+def test_broadcast_and_other_address(mb):
+    assert mb.request([5, 0, 0, 0xff, 0], address=0) is None
+    assert mb.sim.board.outputs() == 0x0001
+    assert mb.request([5, 0, 0, 0, 0], address=2) is None
+    assert mb.sim.board.outputs() == 0x0001
@@ -0,0 +1,66 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# Over-voltage and thermal shutdown protection of the outputs
+
+def _state(sim):
+    Iono = sim.iono
+    from iono_d16.state import IMG_OV_LOCK, IMG_THSD_LOCK
+    st = Iono._state
+    return (sim.board.outputs(), st.word(IMG_OV_LOCK),
+            st.word(IMG_THSD_LOCK),
+            Iono._maxOutL._cfgModePP | Iono._maxOutH._cfgModePP << 8)
+
+def test_fault_storm(sim):
+    Iono = sim.iono
+    for n in range(1, 17):
+        assert getattr(Iono, 'D%d' % n).init(Iono.PIN_MODE_OUT_PP
+                if n in (2, 6, 10, 14) else Iono.PIN_MODE_OUT_HS)
+    assert Iono.write_outputs(0xffff, 0x5555)
+    sim.run(200)
+    assert _state(sim) == (0x5555, 0, 0, 0x2222)
+    # Over-voltage on all the outputs: the high ones are locked off
+    for n in range(1, 17):
+        sim.board.inject('ov', n)
+    sim.run(500)
+    assert _state(sim) == (0xdddd, 0xdddd, 0, 0x2222)
+    # Thermal shutdown: the push-pull ones fall back to high-side
+    for n in (1, 2, 3, 9, 10):
+        sim.board.inject('thsd', n)
+    sim.run(500)
+    assert _state(sim) == (0xdcd8, 0xdfdf, 0x0307, 0x2020)
+    # Locked outputs are not written
+    assert not Iono.write_outputs(0xffff, 0xffff)
+    sim.board.clear_faults()
+    sim.run(5000)
+    assert _state(sim) == (0xfcf8, 0xdfdf, 0x0307, 0x2020)
+    # Released when the locks expire, with the push-pull mode restored
+    sim.run(40000)
+    assert _state(sim) == (0xffff, 0, 0, 0x2222)
+
+def test_lock_times(sim):
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_OUT_HS)
+    Iono.D3.on()
+    assert Iono.D3.lock_times(ov_ms=2000) == (2000, 30000)
+    assert Iono.D3.lock_times() == (2000, 30000)
+    sim.board.inject('ov', 3)
+    sim.run(300)
+    sim.board.clear_faults()
+    sim.run(1500)
+    assert Iono.D3.over_voltage_lock() == 1
+    assert Iono.D4.over_voltage_lock() == 0
+    sim.run(800)
+    assert Iono.D3.over_voltage_lock() == 0
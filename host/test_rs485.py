@@ -0,0 +1,96 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# RS-485 half-duplex send and framed receive
+
+import iono_sim
+
+def _rs485(sim, **kwargs):
+    rs = sim.iono.RS485
+    rs.init(baudrate=115200, **kwargs)
+    return rs, sim.board.uart(0)
+
+def _idle(rs):
+    # Lets the line idle time elapse, polling meanwhile
+    for i in range(4):
+        iono_sim.advance(rs.idle_us())
+        rs.poll()
+
+def test_send(sim):
+    rs, port = _rs485(sim)
+    rs.send(b'\x01\x02\x03\x04', 3)
+    assert port.take() == b'\x01\x02\x03'
+    assert port.txDisabled == 0
+    # Transmitter released after the send
+    port.tx_put(b'x')
+    assert port.txDisabled == 1
+
+def test_frames(sim):
+    rs, port = _rs485(sim)
+    buf = bytearray(16)
+    assert rs.recv(buf) == 0
+    port.feed(b'abc')
+    rs.poll()
+    # Not complete before the idle time
+    assert rs.recv(buf) == 0
+    _idle(rs)
+    port.feed(b'defgh')
+    _idle(rs)
+    assert rs.recv(buf) == 3 and buf[:3] == b'abc'
+    assert rs.recv(buf) == 5 and buf[:5] == b'defgh'
+    assert rs.recv(buf) == 0
+    # Truncated to the buffer
+    port.feed(b'0123456789')
+    _idle(rs)
+    assert rs.recv(buf[:4]) == 4
+    assert rs.rx_overflows() == 0
+
+def test_ring_wrap(sim):
+    rs, port = _rs485(sim, rx_ring=32)
+    buf = bytearray(32)
+    for i in range(5):
+        # Longer than the UART reads, wrapping around the ring end
+        data = bytes(range(i, i + 20))
+        port.feed(data)
+        _idle(rs)
+        assert rs.recv(buf) == 20 and buf[:20] == data
+    assert rs.rx_overflows() == 0
+
+def test_ring_overflow(sim):
+    rs, port = _rs485(sim, rx_ring=16)
+    buf = bytearray(32)
+    port.feed(b'12345678')
+    _idle(rs)
+    # Does not fit in the remaining 8 bytes: dropped as a whole
+    port.feed(b'abcdefghijkl')
+    _idle(rs)
+    port.feed(b'xyz')
+    _idle(rs)
+    assert rs.rx_overflows(reset=True) == 1
+    assert rs.recv(buf) == 8 and buf[:8] == b'12345678'
+    assert rs.recv(buf) == 3 and buf[:3] == b'xyz'
+    assert rs.recv(buf) == 0
+    assert rs.rx_overflows() == 0
+
+def test_frames_overflow(sim):
+    rs, port = _rs485(sim)
+    buf = bytearray(16)
+    for i in range(10):
+        port.feed(bytes([i]))
+        _idle(rs)
+    assert rs.rx_overflows() == 2
+    for i in range(8):
+        assert rs.recv(buf) == 1 and buf[0] == i
+    assert rs.recv(buf) == 0
@@ -0,0 +1,37 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# SPI frames of the chip drivers
+
+def test_frames_locked(sim, monkeypatch):
+    # Frames are queued and their replies parsed with Spi.mutex held, as
+    # they are shared by the two cores and the timer callbacks
+    from iono_d16.spi import Spi, SpiFrames
+    Iono = sim.iono
+    unlocked = []
+    add = SpiFrames.add
+    def lockedAdd(self, *args):
+        if not Spi.mutex.locked():
+            unlocked.append(args)
+        return add(self, *args)
+    monkeypatch.setattr(SpiFrames, 'add', lockedAdd)
+    Iono.D1.init(Iono.PIN_MODE_OUT_HS)
+    Iono.D2.init(Iono.PIN_MODE_IN, wb_ol=True)
+    Iono.D1.on()
+    sim.board.corrupt(3)
+    sim.run(100)
+    assert Iono.D1.value() == 1
+    assert unlocked == []
+    assert not Spi.mutex.locked()
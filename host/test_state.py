@@ -0,0 +1,94 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# State image published by Iono.process() and read-and-clear of the faults
+
+from array import array
+
+def test_publish(sim):
+    Iono = sim.iono
+    Iono.D2.init(Iono.PIN_MODE_IN)
+    buf = array('I', [0] * 10)
+    seq = Iono.read_state(buf)
+    sim.board.set_input(2, 1)
+    # Not visible before the next process()
+    assert Iono.D2.value() == 0
+    sim.run(1)
+    assert Iono.D2.value() == 1
+    assert Iono.read_state(buf) == seq + 1
+    assert buf[0] == 0x0002
+
+def test_fault_read_and_clear(sim):
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_IN, wb_ol=True)
+    sim.board.inject('wb', 3)
+    sim.run(300)
+    sim.board.inject('wb', 3, False)
+    assert Iono.D3.wire_break() == 1
+    # Cleared, also before the clear is applied by process()
+    assert Iono.D3.wire_break() == 0
+    sim.run(300)
+    assert Iono.D3.wire_break() == 0
+
+def test_faults_clear(sim):
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_IN, wb_ol=True)
+    sim.board.inject('wb', 3)
+    sim.run(300)
+    sim.board.inject('wb', 3, False)
+    assert Iono.faults(clear=True)[Iono.FAULT_WB] == 0x0004
+    assert Iono.faults(clear=True)[Iono.FAULT_WB] == 0
+    sim.run(300)
+    assert Iono.faults()[Iono.FAULT_WB] == 0
+
+def test_clear_faults(sim):
+    Iono = sim.iono
+    Iono.D1.init(Iono.PIN_MODE_OUT_HS, wb_ol=True)
+    sim.board.inject('ol', 1)
+    sim.run(300)
+    sim.board.inject('ol', 1, False)
+    assert Iono.faults()[Iono.FAULT_OL] == 0x0001
+    assert Iono.clear_faults(Iono.FAULT_OL)
+    assert not Iono.clear_faults(Iono.FAULT_OV_LOCK)
+    sim.run(300)
+    assert Iono.faults()[Iono.FAULT_OL] == 0
+
+def test_fault_after_clear(sim):
+    # A fault raised again after the read-and-clear is not lost with the
+    # clear still pending
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_IN, wb_ol=True)
+    sim.board.inject('wb', 3)
+    sim.run(300)
+    sim.board.inject('wb', 3, False)
+    assert Iono.D3.wire_break() == 1
+    sim.board.inject('wb', 3)
+    sim.run(300)
+    sim.board.inject('wb', 3, False)
+    assert Iono.D3.wire_break() == 1
+    assert Iono.D3.wire_break() == 0
+
+def test_persistent_fault(sim):
+    # Reported on every read while present
+    Iono = sim.iono
+    Iono.D3.init(Iono.PIN_MODE_IN, wb_ol=True)
+    sim.board.inject('wb', 3)
+    sim.run(300)
+    for i in range(3):
+        assert Iono.D3.wire_break() == 1
+        sim.run(1)
+    assert Iono.faults(clear=True)[Iono.FAULT_WB] == 0x0004
+    sim.run(1)
+    assert Iono.faults(clear=True)[Iono.FAULT_WB] == 0x0004
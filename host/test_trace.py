@@ -0,0 +1,37 @@
+'''
+Iono RP D16 host tests
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# SPI frames trace
+
+import io
+
+def test_not_initialized(sim):
+    from iono_d16.trace import Trace
+    Trace.clear()
+    assert Trace.dump() == bytearray()
+    out = io.BytesIO()
+    Trace.dump(out)
+    assert out.getvalue() == b''
+
+def test_dump(sim):
+    from iono_d16.trace import Trace
+    Trace.init(2)
+    for i in range(3):
+        Trace.frame(i, 1, 2, 3, b'\x04\x05\x06', 0, Trace.F_CRC)
+    recs = list(Trace.decode(Trace.dump()))
+    assert [r[1] for r in recs] == [1, 2]
+    assert recs[0][2:] == (b'\x01\x02\x03', b'\x04\x05\x06', Trace.F_CRC)
+    Trace.clear()
+    assert Trace.dump() == bytearray()
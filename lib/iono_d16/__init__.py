@@ -15,33 +15,17 @@ See file LICENSE.txt for further informations on licensing terms.
 
 from micropython import const
 from machine import Pin as MPin
-from machine import UART
+from array import array
 from iono_d16.io import *
 from iono_d16.max14912 import *
 from iono_d16.max22190 import *
 from iono_d16.spi import *
+from iono_d16.sched import TaskScheduler
+from iono_d16.stats import CycleStats
+from iono_d16.state import StateImage
 
 __version__ = '1.0.0'
 
-class _RS485:
-    PIN_TX = const(16)
-    PIN_RX = const(17)
-    PIN_TXEN_N = const(14)
-
-    def __init__(self):
-        self._txen_n = MPin(PIN_TXEN_N, MPin.OUT)
-        self.init()
-
-    def init(self, baudrate=9600, bits=8, parity=None, stop=1, **kwargs):
-        self._uart = UART(0, baudrate=baudrate, bits=bits, parity=parity,
-                        stop=stop, tx=MPin(PIN_TX), rx=MPin(PIN_RX), **kwargs)
-
-    def __getattr__(self, attr):
-        return getattr(self._uart, attr)
-
-    def txen(self, enable):
-        self._txen_n(not enable)
-
 class _LED:
     def __init__(self, ctrlD, ctrlClk1, ctrlClk2):
         self._set = True
@@ -92,6 +76,9 @@ class _Iono:
 
     PIN_MAX22190_LATCH = const(9)
 
+    # Same as _RS485.PIN_TXEN_N, not to import rs485 until used
+    _PIN_RS485_TXEN_N = const(14)
+
     LINK_NONE = const(0)
     LINK_FOLLOW = const(1)
     LINK_INVERT = const(2)
@@ -104,8 +91,107 @@ class _Iono:
     PIN_MODE_OUT_PP = PinMode.OUT_PP
     PIN_MODE_OUT = PinMode.OUT
 
+    IRQ_RISING = MaxIO.IRQ_RISING
+    IRQ_FALLING = MaxIO.IRQ_FALLING
+
+    COUNT_RISING = MaxIO.COUNT_RISING
+    COUNT_FALLING = MaxIO.COUNT_FALLING
+    COUNT_BOTH = MaxIO.COUNT_BOTH
+
+    FLT_DELAY_50US = MaxIO.FLT_DELAY_50US
+    FLT_DELAY_100US = MaxIO.FLT_DELAY_100US
+    FLT_DELAY_400US = MaxIO.FLT_DELAY_400US
+    FLT_DELAY_800US = MaxIO.FLT_DELAY_800US
+    FLT_DELAY_1600US = MaxIO.FLT_DELAY_1600US
+    FLT_DELAY_3200US = MaxIO.FLT_DELAY_3200US
+    FLT_DELAY_12800US = MaxIO.FLT_DELAY_12800US
+    FLT_DELAY_20MS = MaxIO.FLT_DELAY_20MS
+    FLT_BYPASS = MaxIO.FLT_BYPASS
+
+    FAULT_WB = const(0)
+    FAULT_OL = const(1)
+    FAULT_OV = const(2)
+    FAULT_OV_LOCK = const(3)
+    FAULT_THSD = const(4)
+    FAULT_THSD_LOCK = const(5)
+    FAULT_ALRM_T1 = const(6)
+    FAULT_ALRM_T2 = const(7)
+    FAULT_CHANGED = const(8)
+
+    TASK_FAULTS = const(0)
+    TASK_OL = const(1)
+    TASK_OV = const(2)
+    TASK_REFRESH = const(3)
+    TASK_THSD = const(4)
+
+    _TASK_PERIOD_MS = const(100)
+
     def __init__(self):
         self._setupDone = False
+        self._driver = None
+        self._plc = None
+        self._cycle = CycleStats()
+
+    def __getattr__(self, name):
+        # Called only for the attributes not set yet: creates the
+        # subsystems on first access
+        if not self._setupDone:
+            raise AttributeError(name)
+        if name == 'RS485':
+            from iono_d16.rs485 import _RS485
+            obj = _RS485()
+            obj.txen(False)
+        elif name.startswith('DT') and name[2:] in ('1', '2', '3', '4'):
+            obj = DTPin(name, PIN_DT1 + int(name[2:]) - 1)
+        elif name[0] == 'D' and name[1:].isdigit() and \
+                1 <= int(name[1:]) <= 16:
+            num = int(name[1:])
+            if num <= 8:
+                obj = MaxIO(self._maxInL, self._maxOutL, num)
+            else:
+                obj = MaxIO(self._maxInH, self._maxOutH, num)
+        else:
+            raise AttributeError(name)
+        setattr(self, name, obj)
+        return obj
+
+    def _pwmGet(self):
+        if self._pwm is None:
+            from iono_d16.pwm import SoftPwm
+            self._pwm = SoftPwm(self._maxOutL, self._maxOutH)
+        return self._pwm
+
+    def _eventsGet(self):
+        if self._events is None:
+            from iono_d16.events import InputEvents
+            self._events = InputEvents()
+        return self._events
+
+    def _countersGet(self):
+        if self._counters is None:
+            from iono_d16.counters import PulseCounters
+            self._counters = PulseCounters(self._state)
+        return self._counters
+
+    def _driverGet(self):
+        if self._driver is None:
+            from iono_d16.driver import ProcessDriver
+            self._driver = ProcessDriver(self.process, self._locked)
+        return self._driver
+
+    def _locked(self):
+        # Whether any of the locks taken by process() is held. Called on
+        # the core of Iono.start_timer(), where the holder can only be the
+        # interrupted code, or the other core, which releases it anyway
+        for lock in (Spi.mutex, self._state._clrLock,
+                None if self._pwm is None else self._pwm._lock,
+                None if self._events is None else self._events._lock,
+                None if self._counters is None else self._counters._lock):
+            if lock is not None:
+                if not lock.acquire(0):
+                    return True
+                lock.release()
+        return False
 
     def init(self):
         if self._setupDone:
@@ -118,41 +204,58 @@ class _Iono:
 
         MPin(PIN_MAX14912_WD_EN, MPin.OUT, None).value(1)
 
-        self.RS485 = _RS485()
-        self.RS485.txen(False)
+        # RS-485 transmitter disabled until Iono.RS485 is used
+        MPin(_PIN_RS485_TXEN_N, MPin.OUT, value=1)
 
         Spi.init()
 
+        # PWM, events, counters, RS485, D<n> and DT<n> are created on
+        # first use, see __getattr__()
+        self._pwm = None
+        self._events = None
+        self._counters = None
+        self._rec = None
+        MaxIO._iono = self
+        self._state = StateImage()
+        MaxIO._state = self._state
+        self._clrBuf = array('I', [0] * IMG_SIZE)
+        self._faultsImg = array('I', [0] * IMG_SIZE)
+        self._faultsPrev = array('I', [0] * 8)
+
+        # Created here to be turned on by the first process()
         self.LED = _LED(self._maxOutL._pinCs,
                     self._maxInL._pinCs, self._maxInH._pinCs)
 
-        self.D1 = MaxIO(self._maxInL, self._maxOutL, 1)
-        self.D2 = MaxIO(self._maxInL, self._maxOutL, 2)
-        self.D3 = MaxIO(self._maxInL, self._maxOutL, 3)
-        self.D4 = MaxIO(self._maxInL, self._maxOutL, 4)
-        self.D5 = MaxIO(self._maxInL, self._maxOutL, 5)
-        self.D6 = MaxIO(self._maxInL, self._maxOutL, 6)
-        self.D7 = MaxIO(self._maxInL, self._maxOutL, 7)
-        self.D8 = MaxIO(self._maxInL, self._maxOutL, 8)
-        self.D9 = MaxIO(self._maxInH, self._maxOutH, 9)
-        self.D10 = MaxIO(self._maxInH, self._maxOutH, 10)
-        self.D11 = MaxIO(self._maxInH, self._maxOutH, 11)
-        self.D12 = MaxIO(self._maxInH, self._maxOutH, 12)
-        self.D13 = MaxIO(self._maxInH, self._maxOutH, 13)
-        self.D14 = MaxIO(self._maxInH, self._maxOutH, 14)
-        self.D15 = MaxIO(self._maxInH, self._maxOutH, 15)
-        self.D16 = MaxIO(self._maxInH, self._maxOutH, 16)
-
-        self.DT1 = DTPin('DT1', PIN_DT1)
-        self.DT2 = DTPin('DT2', PIN_DT2)
-        self.DT3 = DTPin('DT3', PIN_DT3)
-        self.DT4 = DTPin('DT4', PIN_DT4)
-
         ok = self._maxInL.init()
         ok = self._maxInH.init() and ok
 
-        self._processStep = 0
-        self._processTs = 0
+        # Both input words read with a single mutex acquisition
+        self._inFrames = SpiFrames(2)
+
+        # One task per chip, staggered so that each process() call
+        # performs at most one of them
+        self._sched = TaskScheduler(10)
+        tasks = (
+            (TASK_FAULTS, self._maxInL.updateFaults),
+            (TASK_FAULTS, self._maxInH.updateFaults),
+            (TASK_OL, self._maxOutL.updateOl),
+            (TASK_OL, self._maxOutH.updateOl),
+            (TASK_OV, self._maxOutL.updateOv),
+            (TASK_OV, self._maxOutH.updateOv),
+            (TASK_REFRESH, self._maxOutL.refreshOutputs),
+            (TASK_REFRESH, self._maxOutH.refreshOutputs),
+            (TASK_THSD, self._maxOutL.updateThsd),
+            (TASK_THSD, self._maxOutH.updateThsd),
+        )
+        step = _TASK_PERIOD_MS // len(tasks)
+        for i in range(len(tasks)):
+            task, fn = tasks[i]
+            self._sched.add(fn, task, _TASK_PERIOD_MS, i * step)
+
+        # Latest inputs, for the core running process() only, the other
+        # cores read them from the state image
+        self._inWord = 0
+        self._inTs = 0
         self._setupDone = True
 
         self.process()
@@ -163,45 +266,345 @@ class _Iono:
         if not self._setupDone:
             return
 
-        mis = [self._maxInL, self._maxInH]
-        mos = [self._maxOutL, self._maxOutH]
+        t = time.ticks_us()
 
-        # WB is read always to update the inputs state
-        for mi in mis:
-            mi.updateWb()
-
-        if time.ticks_diff(time.ticks_ms(), self._processTs) > 20:
-            if self._processStep == 0:
-                for mi in mis:
-                    mi.updateFault1()
-                for mi in mis:
-                    mi.updateFault2()
-            elif self._processStep == 1:
-                for mo in mos:
-                    mo.updateOl()
-            elif self._processStep == 2:
-                for mo in mos:
-                    mo.updateOv()
-            elif self._processStep == 3:
-                for mo in mos:
-                    mo.refreshOutputs()
-            else:
-                for mo in mos:
-                    mo.updateThsd()
-                _processStep = -1
+        self._scan()
+        self._maintain()
+        self._publish()
 
-            self._processStep += 1
-            self._processTs = time.ticks_ms()
+        self._cycle.update(time.ticks_diff(time.ticks_us(), t))
 
-        for d in self.d_pins():
-            d._processPwm()
+    def _readInputs(self):
+        # WB is read always to update the inputs state
+        fr = self._inFrames
+        Spi.lock()
+        try:
+            fr.clear()
+            offL = self._maxInL.addWbRead(fr)
+            offH = self._maxInH.addWbRead(fr)
+            fr.run()
+            okL = self._maxInL.wbReply(fr.buf, offL)
+            okH = self._maxInH.wbReply(fr.buf, offH)
+        finally:
+            Spi.mutex.release()
+        if not okL:
+            self._maxInL.updateWb()
+        if not okH:
+            self._maxInH.updateWb()
+
+    def _scan(self):
+        # Fault clears applied before the registers are read, so that a
+        # fault still present is set again in the image to be published
+        if self._state._clrPending:
+            self._applyClears()
+        self._readInputs()
+
+        word = REV8[self._maxInL._inputs] | (REV8[self._maxInH._inputs] << 8)
+        ts = time.ticks_us()
+        prev = self._inWord
+        changed = word ^ prev
+        self._inWord = word
+        self._inTs = ts
+
+        ev = self._events
+        if changed and ev is not None and ev._en:
+            ev.push(changed, word, ts)
+        cnt = self._counters
+        if cnt is not None and cnt._en:
+            cnt.update(prev, word, ts)
+
+    def _scanPublish(self):
+        self._scan()
+        self._publish()
+
+    def _applyClears(self):
+        clr = self._clrBuf
+        self._state.takeClears(clr)
+        inL = self._maxInL
+        inH = self._maxInH
+        outL = self._maxOutL
+        outH = self._maxOutH
+        m = clr[IMG_WB]
+        if m:
+            inL._faultMemWb &= ~REV8[m & 0xff]
+            inH._faultMemWb &= ~REV8[m >> 8]
+        m = clr[IMG_OL]
+        if m:
+            outL._faultMemOl &= ~m
+            outH._faultMemOl &= ~(m >> 8)
+        m = clr[IMG_OV]
+        if m:
+            outL._faultMemOv &= ~m
+            outH._faultMemOv &= ~(m >> 8)
+        m = clr[IMG_THSD]
+        if m:
+            outL._faultMemThsd &= ~m
+            outH._faultMemThsd &= ~(m >> 8)
+            inL._faultMemOtshdn &= ~REV8[m & 0xff]
+            inH._faultMemOtshdn &= ~REV8[m >> 8]
+        m = clr[IMG_ALRM_T1]
+        if m:
+            inL._faultMemAlrmT1 &= ~REV8[m & 0xff]
+            inH._faultMemAlrmT1 &= ~REV8[m >> 8]
+        m = clr[IMG_ALRM_T2]
+        if m:
+            inL._faultMemAlrmT2 &= ~REV8[m & 0xff]
+            inH._faultMemAlrmT2 &= ~REV8[m >> 8]
+
+    def _publish(self):
+        # Fills the back buffer of the state image and switches it to
+        # the front
+        inL = self._maxInL
+        inH = self._maxInH
+        outL = self._maxOutL
+        outH = self._maxOutH
+        img = self._state.back()
+        img[IMG_INPUTS] = self._inWord
+        img[IMG_WB] = REV8[inL._faultMemWb] | (REV8[inH._faultMemWb] << 8)
+        img[IMG_OL] = outL._faultMemOl | (outH._faultMemOl << 8)
+        img[IMG_OV] = outL._faultMemOv | (outH._faultMemOv << 8)
+        img[IMG_OV_LOCK] = outL._ovLock | (outH._ovLock << 8)
+        img[IMG_THSD] = outL._faultMemThsd | (outH._faultMemThsd << 8) | \
+                REV8[inL._faultMemOtshdn] | (REV8[inH._faultMemOtshdn] << 8)
+        img[IMG_THSD_LOCK] = outL._thsdLock | (outH._thsdLock << 8)
+        img[IMG_ALRM_T1] = REV8[inL._faultMemAlrmT1] | \
+                (REV8[inH._faultMemAlrmT1] << 8)
+        img[IMG_ALRM_T2] = REV8[inL._faultMemAlrmT2] | \
+                (REV8[inH._faultMemAlrmT2] << 8)
+        img[IMG_TS] = self._inTs
+        rec = self._rec
+        if rec is not None and rec._en:
+            rec.sample(self._inWord, self._inTs, img)
+        self._state.publish()
+
+    def _maintain(self):
+        self._sched.run()
+
+        if self._pwm is not None:
+            self._pwm.process()
 
         self.LED._process()
 
+    def run(self, period_us=1000):
+        self._driverGet().run_loop(period_us)
+
+    def run_cycle(self, logic, scan_us=10000):
+        from iono_d16.plc import ScanCycle
+        self._plc = ScanCycle(self, logic, scan_us)
+        self._plc.run()
+
+    def cycle_stats(self, reset=False):
+        if self._plc is None:
+            return (0, 0, 0, 0, 0)
+        return self._plc.stats(reset)
+
+    def run_scan(self, period_us=1000):
+        self._driverGet().run_scan(self._scanPublish, self._maintain, period_us)
+
+    def scan_stats(self, reset=False):
+        return self._driverGet().scan_stats(reset)
+
+    def start_timer(self, period_us=1000):
+        self._driverGet().start_timer(period_us)
+
+    def stop(self):
+        if self._driver is not None:
+            self._driver.stop()
+        if self._plc is not None:
+            self._plc.stop()
+
+    def driver_stats(self, reset=False):
+        return self._driverGet().stats(reset)
+
+    def configure(self, pins, joins=None):
+        # Validation first, nothing is written if not valid
+        modes = MaxIO._modes()
+        mask = 0
+        outs = 0
+        pp = 0
+        wbOl = 0
+        flt = [None] * 16
+        for num in pins:
+            spec = pins[num]
+            if isinstance(spec, int):
+                spec = (spec,)
+            mode = spec[0]
+            wb = len(spec) > 1 and spec[1]
+            if not (1 <= num <= 16) or (mode != PinMode.IN and
+                    mode != PinMode.OUT_HS and mode != PinMode.OUT_PP):
+                return False
+            if mode == PinMode.OUT_PP and wb:
+                # Open-load detection works in high-side mode only
+                return False
+            bit = 1 << (num - 1)
+            mask |= bit
+            modes[num - 1] = mode
+            if mode != PinMode.IN:
+                outs |= bit
+            if mode == PinMode.OUT_PP:
+                pp |= bit
+            if wb:
+                wbOl |= bit
+            if len(spec) > 2 and spec[2] is not None:
+                if not Max22190.validFilter(spec[2]):
+                    return False
+                flt[num - 1] = spec[2]
+        joinL = None
+        joinH = None
+        if joins is not None:
+            # Join bits of each chip, for D1-D4 and D5-D8 (D9-D12, D13-D16)
+            joinL = self._maxOutL._cfgJoin & ~0x0c
+            joinH = self._maxOutH._cfgJoin & ~0x0c
+            for num in joins:
+                if not (1 <= num <= 16) or not MaxIO._joinable(num, modes):
+                    return False
+                bit = 0x04 if (num - 1) % 8 <= 3 else 0x08
+                if num <= 8:
+                    joinL |= bit
+                else:
+                    joinH |= bit
+
+        for num in range(1, 17):
+            if mask & (1 << (num - 1)):
+                if self._pwm is not None:
+                    self._pwm.stop(num - 1)
+                getattr(self, 'D' + str(num))
+
+        # MAX22190 inputs are in reverse order
+        fltL = [flt[7 - i] for i in range(8)]
+        fltH = [flt[15 - i] for i in range(8)]
+        inL = self._maxInL
+        inH = self._maxInH
+        outL = self._maxOutL
+        outH = self._maxOutH
+        # Wire-break detection disabled on the new outputs before
+        # configuring them, enabled on the new inputs after
+        m = mask & outs
+        okL = inL.configure(REV8[m & 0xff], 0, fltL)
+        okH = inH.configure(REV8[m >> 8], 0, fltH)
+        ol = wbOl & outs
+        okL = outL.configure(mask & 0xff, pp & 0xff, ol & 0xff,
+                            outs & 0xff, joinL) and okL
+        okH = outH.configure(mask >> 8, pp >> 8, ol >> 8,
+                            outs >> 8, joinH) and okH
+        m = mask & ~outs
+        w = wbOl & ~outs
+        okL = inL.configure(REV8[m & 0xff], REV8[w & 0xff], fltL) and okL
+        okH = inH.configure(REV8[m >> 8], REV8[w >> 8], fltH) and okH
+
+        # As with D<n>.init(), the modes are set only on success, here of
+        # the chips of D1-D8 and of D9-D16
+        for num in range(1, 17):
+            if mask & (1 << (num - 1)) and (okL if num <= 8 else okH):
+                MaxIO._list[num - 1]._mode = modes[num - 1]
+        return okL and okH
+
+    def stats(self, reset=False):
+        ret = {}
+        for name, chip in (('DOL', self._maxOutL), ('DOH', self._maxOutH),
+                            ('DIL', self._maxInL), ('DIH', self._maxInH)):
+            st = chip._frames.stats
+            ret[name] = tuple(st)
+            if reset:
+                for i in range(len(st)):
+                    st[i] = 0
+        ret['mutex'] = Spi.mutexStats(reset)
+        ret['process'] = self._cycle.stats(reset)
+        return ret
+
+    def task_period(self, task, period_ms):
+        self._sched.period(task, period_ms)
+
+    def task_overruns(self, task, reset=False):
+        return self._sched.overruns(task, reset)
+
+    def read_inputs(self, buf=None):
+        st = self._state
+        while True:
+            seq = st._seq
+            img = st._img[seq & 1]
+            word = img[IMG_INPUTS]
+            ts = img[IMG_TS]
+            if seq == st._seq:
+                break
+        if buf is None:
+            return (word, ts, seq)
+        buf[0] = word
+        buf[1] = ts
+        buf[2] = seq
+        return buf
+
+    def read_state(self, buf):
+        return self._state.read(buf)
+
+    def faults(self, buf=None, clear=False):
+        img = self._faultsImg
+        self._state.read(img)
+        self._state.maskClears(img)
+        prev = self._faultsPrev
+        changed = 0
+        for i in range(8):
+            w = img[IMG_WB + i]
+            changed |= w ^ prev[i]
+            prev[i] = w
+        if clear and (img[IMG_WB] | img[IMG_OL] | img[IMG_OV] |
+                img[IMG_THSD] | img[IMG_ALRM_T1] | img[IMG_ALRM_T2]):
+            self._state.postClears(img)
+        if buf is None:
+            return (img[IMG_WB], img[IMG_OL], img[IMG_OV], img[IMG_OV_LOCK],
+                    img[IMG_THSD], img[IMG_THSD_LOCK], img[IMG_ALRM_T1],
+                    img[IMG_ALRM_T2], changed)
+        for i in range(8):
+            buf[i] = img[IMG_WB + i]
+        buf[FAULT_CHANGED] = changed
+        return buf
+
+    def clear_faults(self, kind, mask=0xffff):
+        if kind == FAULT_OV_LOCK or kind == FAULT_THSD_LOCK or \
+                kind < 0 or kind >= FAULT_CHANGED:
+            return False
+        self._state.postClear(IMG_WB + kind, mask & 0xffff)
+        return True
+
+    def write_outputs(self, mask, values):
+        ok = True
+        if mask & 0xff:
+            ok = self._maxOutL.writeMaskProtected(mask & 0xff, values & 0xff)
+        if mask & 0xff00:
+            ok = self._maxOutH.writeMaskProtected(
+                        (mask >> 8) & 0xff, (values >> 8) & 0xff) and ok
+        return ok
+
+    def read_events(self, buf):
+        return self._eventsGet().read(buf)
+
+    def dispatch_events(self):
+        return self._eventsGet().dispatch()
+
+    def events_overflow(self, reset=False):
+        return self._eventsGet().overflows(reset)
+
+    def recorder(self, samples=512, changes=False, dt_pins=True):
+        # Replaces the current recorder, if any
+        from iono_d16.recorder import Recorder
+        self._rec = None
+        pins = [PIN_DT1 + i for i in range(4)] if dt_pins else ()
+        self._rec = Recorder(samples, changes, pins)
+        return self._rec
+
+    def pwm_sync(self, mask):
+        self._pwmGet().sync(mask)
+
+    def pwm_stats(self, reset=False):
+        return self._pwmGet().stats(reset)
+
     def ready(self):
         return self._setupDone
 
     def d_pins(self):
+        for num in range(1, 17):
+            if MaxIO._list[num - 1] is None:
+                getattr(self, 'D' + str(num))
         return MaxIO._list
 
 Iono = _Iono()
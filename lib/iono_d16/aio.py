@@ -0,0 +1,101 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+import asyncio
+import time
+from iono_d16 import Iono
+
+_waiters = []
+
+def _listener(mask, state, ts):
+    for w in _waiters:
+        bit = w[0]
+        if mask & bit and w[1] & (Iono.IRQ_RISING if state & bit else
+                                    Iono.IRQ_FALLING):
+            w[2].set()
+
+async def process_task(period_ms=1):
+    # Runs Iono.process() cooperatively, dispatching the input events
+    while True:
+        Iono.process()
+        Iono.dispatch_events()
+        await asyncio.sleep_ms(period_ms)
+
+async def dispatch_task(period_ms=1):
+    # Dispatches the input events when Iono.process() runs on the
+    # other core
+    while True:
+        Iono.dispatch_events()
+        await asyncio.sleep_ms(period_ms)
+
+async def wait_edge(pin, rising=True, timeout_ms=None):
+    if rising is None:
+        trigger = Iono.IRQ_RISING | Iono.IRQ_FALLING
+    else:
+        trigger = Iono.IRQ_RISING if rising else Iono.IRQ_FALLING
+    w = (1 << (pin._num - 1), trigger, asyncio.Event())
+    Iono._eventsGet().listen(_listener)
+    _waiters.append(w)
+    try:
+        if timeout_ms is None:
+            await w[2].wait()
+        else:
+            await asyncio.wait_for_ms(w[2].wait(), timeout_ms)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        _waiters.remove(w)
+        if not _waiters:
+            Iono._eventsGet().unlisten(_listener)
+
+class RS485Stream(asyncio.StreamWriter):
+    # MicroPython's StreamWriter is also a StreamReader
+    def __init__(self, rs485):
+        super().__init__(rs485._uart)
+        self._rs485 = rs485
+        self._tx = False
+        self._txEnd = 0
+
+    def write(self, buf):
+        # The transmitter is enabled before any byte reaches the UART,
+        # which happens right away if the output buffer is empty
+        rs = self._rs485
+        if not self._tx:
+            self._tx = True
+            rs.txen(True)
+            self._txEnd = time.ticks_us()
+        elif time.ticks_diff(self._txEnd, time.ticks_us()) < 0:
+            self._txEnd = time.ticks_us()
+        self._txEnd = time.ticks_add(self._txEnd, len(buf) * rs._charUs)
+        super().write(buf)
+
+    async def drain(self):
+        await super().drain()
+        if not self._tx:
+            return
+        # Release the line only after the last stop bit has been sent
+        rs = self._rs485
+        if rs._hasTxdone:
+            while not rs._uart.txdone():
+                await asyncio.sleep_ms(0)
+        else:
+            while time.ticks_diff(self._txEnd, time.ticks_us()) > 0:
+                await asyncio.sleep_ms(0)
+        self._tx = False
+        rs.txen(False)
+
+def rs485_streams():
+    s = RS485Stream(Iono.RS485)
+    return (s, s)
@@ -0,0 +1,168 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from micropython import const
+from array import array
+import _thread
+import time
+
+# Edge timestamps kept per pin for the frequency measurement
+_EDGES = const(8)
+# Max interval between on-time accumulations, to stay within the
+# ticks_us() wrap-around period
+_FLUSH_US = const(10000000)
+
+class PulseCounters:
+    RISING = const(1)
+    FALLING = const(2)
+    BOTH = const(3)
+
+    def __init__(self, state):
+        self._state = state
+        self._lock = _thread.allocate_lock()
+        self._en = 0
+        self._riseEn = 0
+        self._fallEn = 0
+        self._count = array('I', [0] * 16)
+        self._windowUs = array('i', [0] * 16)
+        self._edgeTs = array('i', [0] * (16 * _EDGES))
+        self._edgeIdx = bytearray(16)
+        self._edgeN = bytearray(16)
+        self._onS = array('I', [0] * 16)
+        self._onUs = array('I', [0] * 16)
+        self._onTs = array('i', [0] * 16)
+        self._word = 0
+        self._lastTs = time.ticks_us()
+        self._flushTs = self._lastTs
+
+    def _addOn(self, ch, ts):
+        us = self._onUs[ch] + time.ticks_diff(ts, self._onTs[ch])
+        self._onS[ch] += us // 1000000
+        self._onUs[ch] = us % 1000000
+        self._onTs[ch] = ts
+
+    def config(self, ch, mode, windowMs):
+        mask = 1 << ch
+        with self._lock:
+            if not self._en:
+                # update() is not called while no pin is enabled, the
+                # inputs are taken from the last published sample
+                self._word, self._lastTs = self._state.sample()
+                self._flushTs = self._lastTs
+            if self._word & self._en & mask:
+                self._addOn(ch, self._lastTs)
+            self._riseEn &= ~mask
+            self._fallEn &= ~mask
+            if mode & RISING:
+                self._riseEn |= mask
+            if mode & FALLING:
+                self._fallEn |= mask
+            if mode:
+                self._en |= mask
+            else:
+                self._en &= ~mask
+            self._windowUs[ch] = windowMs * 1000
+            self._edgeN[ch] = 0
+            self._onTs[ch] = self._lastTs
+
+    def update(self, prev, word, ts):
+        en = self._en
+        changed = (prev ^ word) & en
+        self._word = word
+        self._lastTs = ts
+        if changed:
+            with self._lock:
+                edges = ((word & self._riseEn) | (prev & self._fallEn)) & \
+                        changed
+                ch = 0
+                while changed:
+                    if changed & 1:
+                        if edges & 1:
+                            self._count[ch] += 1
+                            i = self._edgeIdx[ch]
+                            self._edgeTs[ch * _EDGES + i] = ts
+                            self._edgeIdx[ch] = (i + 1) % _EDGES
+                            if self._edgeN[ch] < _EDGES:
+                                self._edgeN[ch] += 1
+                        if (word >> ch) & 1:
+                            self._onTs[ch] = ts
+                        else:
+                            self._addOn(ch, ts)
+                    changed >>= 1
+                    edges >>= 1
+                    ch += 1
+        if time.ticks_diff(ts, self._flushTs) > _FLUSH_US:
+            self._flushTs = ts
+            on = word & en
+            with self._lock:
+                ch = 0
+                while on:
+                    if on & 1:
+                        self._addOn(ch, ts)
+                    on >>= 1
+                    ch += 1
+
+    def count(self, ch, reset=False):
+        with self._lock:
+            ret = self._count[ch]
+            if reset:
+                self._count[ch] = 0
+        return ret
+
+    def _window(self, ch):
+        # Returns (edges, time span in us) of the edges in the window.
+        # To be called with the lock held
+        n = self._edgeN[ch]
+        if n < 2:
+            return (0, 0)
+        base = ch * _EDGES
+        i = (self._edgeIdx[ch] - 1) % _EDGES
+        newest = self._edgeTs[base + i]
+        win = self._windowUs[ch]
+        if time.ticks_diff(self._lastTs, newest) > win:
+            return (0, 0)
+        k = 1
+        span = 0
+        while k < n:
+            i = (i - 1) % _EDGES
+            dt = time.ticks_diff(newest, self._edgeTs[base + i])
+            if dt > win:
+                break
+            span = dt
+            k += 1
+        return (k - 1, span)
+
+    def frequency(self, ch):
+        with self._lock:
+            n, span = self._window(ch)
+        if span <= 0:
+            return 0
+        return n * 1000000 / span
+
+    def period_us(self, ch):
+        with self._lock:
+            n, span = self._window(ch)
+        if n == 0:
+            return 0
+        return span // n
+
+    def on_time_ms(self, ch, reset=False):
+        with self._lock:
+            if self._word & self._en & (1 << ch):
+                self._addOn(ch, self._lastTs)
+            ret = self._onS[ch] * 1000 + self._onUs[ch] // 1000
+            if reset:
+                self._onS[ch] = 0
+                self._onUs[ch] = 0
+        return ret
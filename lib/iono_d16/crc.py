@@ -0,0 +1,152 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+# The MAX14912 and MAX22190 frame CRCs are linear over GF(2), so the CRC of
+# a frame is the XOR of the contributions of each of its bytes. The tables
+# below hold those contributions, with the constant term of the CRC
+# (init word and trailing bits) folded into the entries of the first byte.
+
+# MAX14912: [0:256] first byte, [256:512] second byte
+_T14912 = (
+    b'\x03\x6b\x64\x0c\x7a\x12\x1d\x75\x46\x2e\x21\x49\x3f\x57\x58\x30'
+    b'\x3e\x56\x59\x31\x47\x2f\x20\x48\x7b\x13\x1c\x74\x02\x6a\x65\x0d'
+    b'\x79\x11\x1e\x76\x00\x68\x67\x0f\x3c\x54\x5b\x33\x45\x2d\x22\x4a'
+    b'\x44\x2c\x23\x4b\x3d\x55\x5a\x32\x01\x69\x66\x0e\x78\x10\x1f\x77'
+    b'\x40\x28\x27\x4f\x39\x51\x5e\x36\x05\x6d\x62\x0a\x7c\x14\x1b\x73'
+    b'\x7d\x15\x1a\x72\x04\x6c\x63\x0b\x38\x50\x5f\x37\x41\x29\x26\x4e'
+    b'\x3a\x52\x5d\x35\x43\x2b\x24\x4c\x7f\x17\x18\x70\x06\x6e\x61\x09'
+    b'\x07\x6f\x60\x08\x7e\x16\x19\x71\x42\x2a\x25\x4d\x3b\x53\x5c\x34'
+    b'\x32\x5a\x55\x3d\x4b\x23\x2c\x44\x77\x1f\x10\x78\x0e\x66\x69\x01'
+    b'\x0f\x67\x68\x00\x76\x1e\x11\x79\x4a\x22\x2d\x45\x33\x5b\x54\x3c'
+    b'\x48\x20\x2f\x47\x31\x59\x56\x3e\x0d\x65\x6a\x02\x74\x1c\x13\x7b'
+    b'\x75\x1d\x12\x7a\x0c\x64\x6b\x03\x30\x58\x57\x3f\x49\x21\x2e\x46'
+    b'\x71\x19\x16\x7e\x08\x60\x6f\x07\x34\x5c\x53\x3b\x4d\x25\x2a\x42'
+    b'\x4c\x24\x2b\x43\x35\x5d\x52\x3a\x09\x61\x6e\x06\x70\x18\x17\x7f'
+    b'\x0b\x63\x6c\x04\x72\x1a\x15\x7d\x4e\x26\x29\x41\x37\x5f\x50\x38'
+    b'\x36\x5e\x51\x39\x4f\x27\x28\x40\x73\x1b\x14\x7c\x0a\x62\x6d\x05'
+    b'\x00\x6e\x6b\x05\x61\x0f\x0a\x64\x75\x1b\x1e\x70\x14\x7a\x7f\x11'
+    b'\x5d\x33\x36\x58\x3c\x52\x57\x39\x28\x46\x43\x2d\x49\x27\x22\x4c'
+    b'\x0d\x63\x66\x08\x6c\x02\x07\x69\x78\x16\x13\x7d\x19\x77\x72\x1c'
+    b'\x50\x3e\x3b\x55\x31\x5f\x5a\x34\x25\x4b\x4e\x20\x44\x2a\x2f\x41'
+    b'\x1a\x74\x71\x1f\x7b\x15\x10\x7e\x6f\x01\x04\x6a\x0e\x60\x65\x0b'
+    b'\x47\x29\x2c\x42\x26\x48\x4d\x23\x32\x5c\x59\x37\x53\x3d\x38\x56'
+    b'\x17\x79\x7c\x12\x76\x18\x1d\x73\x62\x0c\x09\x67\x03\x6d\x68\x06'
+    b'\x4a\x24\x21\x4f\x2b\x45\x40\x2e\x3f\x51\x54\x3a\x5e\x30\x35\x5b'
+    b'\x34\x5a\x5f\x31\x55\x3b\x3e\x50\x41\x2f\x2a\x44\x20\x4e\x4b\x25'
+    b'\x69\x07\x02\x6c\x08\x66\x63\x0d\x1c\x72\x77\x19\x7d\x13\x16\x78'
+    b'\x39\x57\x52\x3c\x58\x36\x33\x5d\x4c\x22\x27\x49\x2d\x43\x46\x28'
+    b'\x64\x0a\x0f\x61\x05\x6b\x6e\x00\x11\x7f\x7a\x14\x70\x1e\x1b\x75'
+    b'\x2e\x40\x45\x2b\x4f\x21\x24\x4a\x5b\x35\x30\x5e\x3a\x54\x51\x3f'
+    b'\x73\x1d\x18\x76\x12\x7c\x79\x17\x06\x68\x6d\x03\x67\x09\x0c\x62'
+    b'\x23\x4d\x48\x26\x42\x2c\x29\x47\x56\x38\x3d\x53\x37\x59\x5c\x32'
+    b'\x7e\x10\x15\x7b\x1f\x71\x74\x1a\x0b\x65\x60\x0e\x6a\x04\x01\x6f'
+)
+
+# MAX22190: [0:256] first byte, [256:512] second byte,
+# [512:520] 3 MSBits of the third byte
+_T22190 = (
+    b'\x07\x05\x03\x01\x0f\x0d\x0b\x09\x17\x15\x13\x11\x1f\x1d\x1b\x19'
+    b'\x12\x10\x16\x14\x1a\x18\x1e\x1c\x02\x00\x06\x04\x0a\x08\x0e\x0c'
+    b'\x18\x1a\x1c\x1e\x10\x12\x14\x16\x08\x0a\x0c\x0e\x00\x02\x04\x06'
+    b'\x0d\x0f\x09\x0b\x05\x07\x01\x03\x1d\x1f\x19\x1b\x15\x17\x11\x13'
+    b'\x0c\x0e\x08\x0a\x04\x06\x00\x02\x1c\x1e\x18\x1a\x14\x16\x10\x12'
+    b'\x19\x1b\x1d\x1f\x11\x13\x15\x17\x09\x0b\x0d\x0f\x01\x03\x05\x07'
+    b'\x13\x11\x17\x15\x1b\x19\x1f\x1d\x03\x01\x07\x05\x0b\x09\x0f\x0d'
+    b'\x06\x04\x02\x00\x0e\x0c\x0a\x08\x16\x14\x12\x10\x1e\x1c\x1a\x18'
+    b'\x11\x13\x15\x17\x19\x1b\x1d\x1f\x01\x03\x05\x07\x09\x0b\x0d\x0f'
+    b'\x04\x06\x00\x02\x0c\x0e\x08\x0a\x14\x16\x10\x12\x1c\x1e\x18\x1a'
+    b'\x0e\x0c\x0a\x08\x06\x04\x02\x00\x1e\x1c\x1a\x18\x16\x14\x12\x10'
+    b'\x1b\x19\x1f\x1d\x13\x11\x17\x15\x0b\x09\x0f\x0d\x03\x01\x07\x05'
+    b'\x1a\x18\x1e\x1c\x12\x10\x16\x14\x0a\x08\x0e\x0c\x02\x00\x06\x04'
+    b'\x0f\x0d\x0b\x09\x07\x05\x03\x01\x1f\x1d\x1b\x19\x17\x15\x13\x11'
+    b'\x05\x07\x01\x03\x0d\x0f\x09\x0b\x15\x17\x11\x13\x1d\x1f\x19\x1b'
+    b'\x10\x12\x14\x16\x18\x1a\x1c\x1e\x00\x02\x04\x06\x08\x0a\x0c\x0e'
+    b'\x00\x16\x19\x0f\x07\x11\x1e\x08\x0e\x18\x17\x01\x09\x1f\x10\x06'
+    b'\x1c\x0a\x05\x13\x1b\x0d\x02\x14\x12\x04\x0b\x1d\x15\x03\x0c\x1a'
+    b'\x0d\x1b\x14\x02\x0a\x1c\x13\x05\x03\x15\x1a\x0c\x04\x12\x1d\x0b'
+    b'\x11\x07\x08\x1e\x16\x00\x0f\x19\x1f\x09\x06\x10\x18\x0e\x01\x17'
+    b'\x1a\x0c\x03\x15\x1d\x0b\x04\x12\x14\x02\x0d\x1b\x13\x05\x0a\x1c'
+    b'\x06\x10\x1f\x09\x01\x17\x18\x0e\x08\x1e\x11\x07\x0f\x19\x16\x00'
+    b'\x17\x01\x0e\x18\x10\x06\x09\x1f\x19\x0f\x00\x16\x1e\x08\x07\x11'
+    b'\x0b\x1d\x12\x04\x0c\x1a\x15\x03\x05\x13\x1c\x0a\x02\x14\x1b\x0d'
+    b'\x01\x17\x18\x0e\x06\x10\x1f\x09\x0f\x19\x16\x00\x08\x1e\x11\x07'
+    b'\x1d\x0b\x04\x12\x1a\x0c\x03\x15\x13\x05\x0a\x1c\x14\x02\x0d\x1b'
+    b'\x0c\x1a\x15\x03\x0b\x1d\x12\x04\x02\x14\x1b\x0d\x05\x13\x1c\x0a'
+    b'\x10\x06\x09\x1f\x17\x01\x0e\x18\x1e\x08\x07\x11\x19\x0f\x00\x16'
+    b'\x1b\x0d\x02\x14\x1c\x0a\x05\x13\x15\x03\x0c\x1a\x12\x04\x0b\x1d'
+    b'\x07\x11\x1e\x08\x00\x16\x19\x0f\x09\x1f\x10\x06\x0e\x18\x17\x01'
+    b'\x16\x00\x0f\x19\x11\x07\x08\x1e\x18\x0e\x01\x17\x1f\x09\x06\x10'
+    b'\x0a\x1c\x13\x05\x0d\x1b\x14\x02\x04\x12\x1d\x0b\x03\x15\x1a\x0c'
+    b'\x00\x15\x1f\x0a\x0b\x1e\x14\x01'
+)
+
+# Modbus CRC-16 (reflected 0x8005, init 0xFFFF):
+# [0:256] low byte, [256:512] high byte of the byte-wise CRC update
+_T16 = (
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x01\xc0\x80\x41\x00\xc1\x81\x40\x00\xc1\x81\x40\x01\xc0\x80\x41'
+    b'\x00\xc1\x81\x40\x01\xc0\x80\x41\x01\xc0\x80\x41\x00\xc1\x81\x40'
+    b'\x00\xc0\xc1\x01\xc3\x03\x02\xc2\xc6\x06\x07\xc7\x05\xc5\xc4\x04'
+    b'\xcc\x0c\x0d\xcd\x0f\xcf\xce\x0e\x0a\xca\xcb\x0b\xc9\x09\x08\xc8'
+    b'\xd8\x18\x19\xd9\x1b\xdb\xda\x1a\x1e\xde\xdf\x1f\xdd\x1d\x1c\xdc'
+    b'\x14\xd4\xd5\x15\xd7\x17\x16\xd6\xd2\x12\x13\xd3\x11\xd1\xd0\x10'
+    b'\xf0\x30\x31\xf1\x33\xf3\xf2\x32\x36\xf6\xf7\x37\xf5\x35\x34\xf4'
+    b'\x3c\xfc\xfd\x3d\xff\x3f\x3e\xfe\xfa\x3a\x3b\xfb\x39\xf9\xf8\x38'
+    b'\x28\xe8\xe9\x29\xeb\x2b\x2a\xea\xee\x2e\x2f\xef\x2d\xed\xec\x2c'
+    b'\xe4\x24\x25\xe5\x27\xe7\xe6\x26\x22\xe2\xe3\x23\xe1\x21\x20\xe0'
+    b'\xa0\x60\x61\xa1\x63\xa3\xa2\x62\x66\xa6\xa7\x67\xa5\x65\x64\xa4'
+    b'\x6c\xac\xad\x6d\xaf\x6f\x6e\xae\xaa\x6a\x6b\xab\x69\xa9\xa8\x68'
+    b'\x78\xb8\xb9\x79\xbb\x7b\x7a\xba\xbe\x7e\x7f\xbf\x7d\xbd\xbc\x7c'
+    b'\xb4\x74\x75\xb5\x77\xb7\xb6\x76\x72\xb2\xb3\x73\xb1\x71\x70\xb0'
+    b'\x50\x90\x91\x51\x93\x53\x52\x92\x96\x56\x57\x97\x55\x95\x94\x54'
+    b'\x9c\x5c\x5d\x9d\x5f\x9f\x9e\x5e\x5a\x9a\x9b\x5b\x99\x59\x58\x98'
+    b'\x88\x48\x49\x89\x4b\x8b\x8a\x4a\x4e\x8e\x8f\x4f\x8d\x4d\x4c\x8c'
+    b'\x44\x84\x85\x45\x87\x47\x46\x86\x82\x42\x43\x83\x41\x81\x80\x40'
+)
+
+def crc14912(byte1, byte2):
+    return _T14912[byte1] ^ _T14912[256 + byte2]
+
+def crc22190(data2, data1, data0):
+    return _T22190[data2] ^ _T22190[256 + data1] ^ _T22190[512 + (data0 >> 5)]
+
+def crc16(buf, n):
+    # Returns the CRC of the first n bytes of buf, to be appended to the
+    # frame low byte first
+    lo = 0xff
+    hi = 0xff
+    for j in range(n):
+        i = lo ^ buf[j]
+        lo = hi ^ _T16[i]
+        hi = _T16[256 + i]
+    return (hi << 8) | lo
+
+try:
+    from iono_d16.crc_viper import crc14912, crc22190, crc16
+except:
+    pass
@@ -0,0 +1,40 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+import micropython
+from iono_d16.crc import _T14912, _T22190, _T16
+
+@micropython.viper
+def crc14912(byte1: int, byte2: int) -> int:
+    t = ptr8(_T14912)
+    return t[byte1] ^ t[256 + byte2]
+
+@micropython.viper
+def crc22190(data2: int, data1: int, data0: int) -> int:
+    t = ptr8(_T22190)
+    return t[data2] ^ t[256 + data1] ^ t[512 + (data0 >> 5)]
+
+@micropython.viper
+def crc16(buf, n: int) -> int:
+    t = ptr8(_T16)
+    b = ptr8(buf)
+    lo = 0xff
+    hi = 0xff
+    j = 0
+    while j < n:
+        i = lo ^ b[j]
+        lo = hi ^ t[i]
+        hi = t[256 + i]
+        j += 1
+    return (hi << 8) | lo
@@ -0,0 +1,184 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+import micropython
+import time
+
+class ProcessDriver:
+    def __init__(self, fn, busyFn=None):
+        # busyFn() returns whether a lock needed by fn() is held, checked
+        # before the timer driven calls
+        self._fn = fn
+        self._busyFn = busyFn
+        self._timer = None
+        self._running = False
+        self._periodUs = 0
+        self._deadline = 0
+        self._pending = False
+        self._onTimerCb = self._onTimer
+        self._onScheduleCb = self._onSchedule
+        self._reset()
+
+    def _run(self, now):
+        if self._count > 0:
+            dt = time.ticks_diff(now, self._lastTs)
+            if dt < self._periodMin:
+                self._periodMin = dt
+            if dt > self._periodMax:
+                self._periodMax = dt
+            self._periodAvg += (dt - self._periodAvg) >> 4
+        self._lastTs = now
+        self._fn()
+        dt = time.ticks_diff(time.ticks_us(), now)
+        if dt < self._execMin:
+            self._execMin = dt
+        if dt > self._execMax:
+            self._execMax = dt
+        self._execAvg += (dt - self._execAvg) >> 4
+        if self._count == 0:
+            self._periodAvg = self._periodUs
+            self._execAvg = dt
+        self._count += 1
+
+    def _late(self, now):
+        # Accounts for the deadlines missed, returns the current deadline
+        late = time.ticks_diff(now, self._deadline)
+        if late >= self._periodUs:
+            self._missed += late // self._periodUs
+            self._deadline = now
+        return self._deadline
+
+    def _onTimer(self, t):
+        # Only schedules the call, to be run by the VM between bytecodes
+        if self._pending:
+            return
+        self._pending = True
+        try:
+            micropython.schedule(self._onScheduleCb, None)
+        except RuntimeError:
+            # Schedule queue full, accounted for as late by the next call
+            self._pending = False
+
+    def _onSchedule(self, arg):
+        self._pending = False
+        if self._timer is None:
+            return
+        now = time.ticks_us()
+        self._late(now)
+        if self._busyFn is not None and self._busyFn():
+            # The interrupted code holds a lock fn() would wait for
+            # forever on this core: the cycle is skipped
+            self._missed += 1
+        else:
+            self._run(now)
+        self._deadline = time.ticks_add(self._deadline, self._periodUs)
+
+    def start_timer(self, periodUs):
+        from machine import Timer
+        self.stop()
+        self._periodUs = periodUs
+        self._deadline = time.ticks_add(time.ticks_us(), periodUs)
+        self._timer = Timer(mode=Timer.PERIODIC, freq=1000000 / periodUs,
+                            callback=self._onTimerCb)
+
+    def run_loop(self, periodUs):
+        self.stop()
+        self._periodUs = periodUs
+        self._deadline = time.ticks_us()
+        self._running = True
+        while self._running:
+            now = time.ticks_us()
+            wait = time.ticks_diff(self._deadline, now)
+            if wait > 0:
+                # Sleep until the absolute deadline, not for a fixed time
+                time.sleep_us(wait)
+                now = time.ticks_us()
+            else:
+                self._late(now)
+            self._run(now)
+            self._deadline = time.ticks_add(self._deadline, periodUs)
+
+    def run_scan(self, scanFn, fn, periodUs):
+        # Calls scanFn() continuously and fn() in between at the fixed
+        # rate, the stats() apply to fn()
+        self.stop()
+        self._periodUs = periodUs
+        now = time.ticks_us()
+        self._deadline = now
+        self._scanTs = now
+        self._scanWinTs = now
+        self._scanWinCount = self._scanCount
+        prev = self._fn
+        self._fn = fn
+        self._running = True
+        try:
+            while self._running:
+                scanFn()
+                now = time.ticks_us()
+                gap = time.ticks_diff(now, self._scanTs)
+                self._scanTs = now
+                if gap > self._scanGapMax:
+                    self._scanGapMax = gap
+                self._scanCount = (self._scanCount + 1) & 0x3fffffff
+                if time.ticks_diff(now, self._deadline) >= 0:
+                    self._late(now)
+                    self._run(now)
+                    self._deadline = time.ticks_add(self._deadline, periodUs)
+                    dt = time.ticks_diff(now, self._scanWinTs)
+                    if dt >= 1000000:
+                        n = (self._scanCount - self._scanWinCount) & 0x3fffffff
+                        self._scanRate = (n * 1000) // (dt // 1000)
+                        self._scanWinTs = now
+                        self._scanWinCount = self._scanCount
+        finally:
+            self._fn = prev
+
+    def stop(self):
+        self._running = False
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _reset(self):
+        self._count = 0
+        self._lastTs = 0
+        self._periodMin = 0x3fffffff
+        self._periodMax = 0
+        self._periodAvg = 0
+        self._execMin = 0x3fffffff
+        self._execMax = 0
+        self._execAvg = 0
+        self._missed = 0
+        self._scanCount = 0
+        self._scanGapMax = 0
+        self._scanRate = 0
+
+    def scan_stats(self, reset=False):
+        ret = (self._scanRate, self._scanCount, self._scanGapMax)
+        if reset:
+            self._scanCount = 0
+            self._scanWinCount = 0
+            self._scanGapMax = 0
+        return ret
+
+    def stats(self, reset=False):
+        if self._count < 2:
+            ret = (0, 0, 0, 0, 0, 0, self._missed)
+        else:
+            ret = (self._periodMin, self._periodAvg, self._periodMax,
+                    self._execMin, self._execAvg, self._execMax,
+                    self._missed)
+        if reset:
+            self._reset()
+        return ret
@@ -0,0 +1,126 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from micropython import const
+from array import array
+import _thread
+
+class InputEvents:
+    RISING = const(1)
+    FALLING = const(2)
+
+    def __init__(self, size=64):
+        self._lock = _thread.allocate_lock()
+        self._size = size
+        self._mask = array('H', [0] * size)
+        self._state = array('H', [0] * size)
+        self._ts = array('i', [0] * size)
+        self._head = 0
+        self._tail = 0
+        self._count = 0
+        self._overflows = 0
+        self._en = False
+        self._pins = [None] * 16
+        self._handlers = [None] * 16
+        self._triggers = bytearray(16)
+        self._handlersMask = 0
+        self._listeners = []
+
+    def push(self, mask, state, ts):
+        with self._lock:
+            if self._count == self._size:
+                self._overflows += 1
+                return
+            i = self._head
+            self._mask[i] = mask
+            self._state[i] = state
+            self._ts[i] = ts
+            i += 1
+            self._head = 0 if i == self._size else i
+            self._count += 1
+
+    def _pop(self):
+        # Returns the index of the oldest record, or -1 if empty.
+        # To be called with the lock held
+        if self._count == 0:
+            return -1
+        i = self._tail
+        self._tail = 0 if i + 1 == self._size else i + 1
+        self._count -= 1
+        return i
+
+    def read(self, buf):
+        self._en = True
+        n = 0
+        with self._lock:
+            while n * 3 + 3 <= len(buf):
+                i = self._pop()
+                if i < 0:
+                    break
+                buf[n * 3] = self._mask[i]
+                buf[n * 3 + 1] = self._state[i]
+                buf[n * 3 + 2] = self._ts[i]
+                n += 1
+        return n
+
+    def irq(self, pin, ch, handler, trigger):
+        self._en = True
+        self._pins[ch] = pin
+        self._handlers[ch] = handler
+        self._triggers[ch] = trigger if handler is not None else 0
+        if handler is None:
+            self._handlersMask &= ~(1 << ch)
+        else:
+            self._handlersMask |= 1 << ch
+
+    def listen(self, listener):
+        # listener(mask, state, ts) is called by dispatch() for each record,
+        # in addition to the ones already added
+        self._en = True
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unlisten(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def dispatch(self):
+        self._en = True
+        n = 0
+        while True:
+            with self._lock:
+                i = self._pop()
+                if i < 0:
+                    return n
+                mask = self._mask[i]
+                state = self._state[i]
+                ts = self._ts[i]
+            n += 1
+            for listener in self._listeners:
+                listener(mask, state, ts)
+            mask &= self._handlersMask
+            ch = 0
+            while mask:
+                if mask & 1:
+                    val = (state >> ch) & 1
+                    if self._triggers[ch] & (RISING if val else FALLING):
+                        self._handlers[ch](self._pins[ch], val, ts)
+                mask >>= 1
+                ch += 1
+
+    def overflows(self, reset=False):
+        ret = self._overflows
+        if reset:
+            self._overflows = 0
+        return ret
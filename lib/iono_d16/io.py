@@ -16,6 +16,11 @@ See file LICENSE.txt for further informations on licensing terms.
 from machine import Pin as MPin
 import time
 from iono_d16.utils import *
+from iono_d16.state import *
+from iono_d16.max22190 import Max22190
+
+# Set to 1 to enable DEBUG() messages
+_DEBUG = const(0)
 
 class PinMode:
     IN = const(1)
@@ -41,9 +46,33 @@ class DTPin(MPin):
         super().init(mode)
 
 class MaxIO:
-    _list = []
-
-    def _joinable(num):
+    IRQ_RISING = const(1)
+    IRQ_FALLING = const(2)
+
+    COUNT_RISING = const(1)
+    COUNT_FALLING = const(2)
+    COUNT_BOTH = const(3)
+
+    FLT_DELAY_50US = const(0)
+    FLT_DELAY_100US = const(1)
+    FLT_DELAY_400US = const(2)
+    FLT_DELAY_800US = const(3)
+    FLT_DELAY_1600US = const(4)
+    FLT_DELAY_3200US = const(5)
+    FLT_DELAY_12800US = const(6)
+    FLT_DELAY_20MS = const(7)
+    FLT_BYPASS = const(8)
+
+    # D1..D16, created on first use
+    _list = [None] * 16
+    _iono = None
+    _state = None
+
+    def _modes():
+        return [None if pin is None else pin._mode for pin in MaxIO._list]
+
+    def _joinable(num, modes):
+        # modes: mode of each pin, D1 first
         idx = num - 1
         base4 = (idx // 4) * 4
         mod4 = idx % 4
@@ -57,19 +86,23 @@ class MaxIO:
             idxHsOrIn2 = base4 + 1
             idxHs1 = base4 + 2
             idxHs2 = base4 + 3
-        if MaxIO._list[idxHs1]._mode != PinMode.OUT_HS:
-            DEBUG(f"outs join {num} err 1")
+        if modes[idxHs1] != PinMode.OUT_HS:
+            if _DEBUG:
+                DEBUG(f"outs join {num} err 1")
             return False
-        if MaxIO._list[idxHs2]._mode != PinMode.OUT_HS:
-            DEBUG(f"outs join {num} err 2")
+        if modes[idxHs2] != PinMode.OUT_HS:
+            if _DEBUG:
+                DEBUG(f"outs join {num} err 2")
             return False
-        if MaxIO._list[idxHsOrIn1]._mode != PinMode.OUT_HS and \
-                MaxIO._list[idxHsOrIn1]._mode != PinMode.IN:
-            DEBUG(f"outs join {num} err 3")
+        mode = modes[idxHsOrIn1]
+        if mode != PinMode.OUT_HS and mode != PinMode.IN:
+            if _DEBUG:
+                DEBUG(f"outs join {num} err 3")
             return False
-        if MaxIO._list[idxHsOrIn2]._mode != PinMode.OUT_HS and \
-                MaxIO._list[idxHsOrIn2]._mode != PinMode.IN:
-            DEBUG(f"outs join {num} err 4")
+        mode = modes[idxHsOrIn2]
+        if mode != PinMode.OUT_HS and mode != PinMode.IN:
+            if _DEBUG:
+                DEBUG(f"outs join {num} err 4")
             return False
         return True
 
@@ -81,19 +114,7 @@ class MaxIO:
         self._outIdx = (num - 1) % 8
         self._name = 'D' + str(num)
         self._mode = None
-        self._pwmPeriodUs = 0
-        MaxIO._list.append(self)
-
-    def _processPwm(self):
-        if self._pwmPeriodUs > 0:
-            dts = time.ticks_diff(time.ticks_us(), self._pwmStartTs)
-            if dts > self._pwmPeriodUs:
-                self.on()
-                self._pwmStartTs = time.ticks_us()
-                self._pwmOn = True
-            elif self._pwmOn and dts > self._pwmDutyUs:
-                self.off()
-                self._pwmOn = False
+        MaxIO._list[num - 1] = self
 
     def __call__(self, on=None):
         return self.value(on)
@@ -101,18 +122,28 @@ class MaxIO:
     def name(self):
         return self._name
 
-    def init(self, mode, wb_ol=False):
-        ok = False
+    def init(self, mode, wb_ol=False, flt=None):
+        if mode != PinMode.IN and mode != PinMode.OUT_HS and \
+                mode != PinMode.OUT_PP:
+            return False
+        if mode == PinMode.OUT_PP and wb_ol:
+            # Open-load detection works in high-side mode only
+            return False
+        if flt is not None and not Max22190.validFilter(flt):
+            return False
+        if MaxIO._iono._pwm is not None:
+            MaxIO._iono._pwm.stop(self._num - 1)
+        if flt is not None:
+            # Applied by the mode() write below
+            cfg = self._maxIn._cfgFlt
+            cfg[self._inIdx] = (cfg[self._inIdx] & 0x10) | (flt & 0x0f)
         if mode == PinMode.IN:
             if not self._maxOut.modeProtected(self._outIdx, False, False):
                 return False
             if not self._maxOut.writeProtected(self._outIdx, 0):
                 return False
             ok = self._maxIn.mode(self._inIdx, wb_ol)
-        elif mode == PinMode.OUT_HS or mode == PinMode.OUT_PP:
-            if mode ==PinMode.OUT_PP and wb_ol:
-                # Open-load detection works in high-side mode only
-                return False
+        else:
             if not self._maxIn.mode(self._inIdx, False):
                 return False
             self._maxOut._ovProtEn = True
@@ -120,29 +151,47 @@ class MaxIO:
                                 self._outIdx, mode == PinMode.OUT_PP, wb_ol)
         if ok:
             self._mode = mode
+            self._maxOut._cfgOut = setBit(self._maxOut._cfgOut, self._outIdx,
+                    mode == PinMode.OUT_HS or mode == PinMode.OUT_PP)
         return ok
 
+    def filter(self, flt):
+        return self._maxIn.filter(self._inIdx, flt)
+
     def joinPair(self, join=True):
-        if join and not MaxIO._joinable(self._num):
+        if join and not MaxIO._joinable(self._num, MaxIO._modes()):
             return False
         return self._maxOut.join(self._outIdx, join)
 
     def pwm(self, freq, duty_u16):
         if self._mode != PinMode.OUT_PP:
             return False
-        self._pwmPeriodUs = 0
-        if duty_u16 == 0:
-            self._maxOut.writeProtected(self._outIdx, 0)
-            return True
-        self._pwmDutyUs = (1000000 // freq) * duty_u16 // 65535
-        self._maxOut.writeProtected(self._outIdx, 1)
-        self._pwmStartTs = time.ticks_us()
-        self._pwmOn = True
-        self._pwmPeriodUs = 1000000 // freq
-        return True
+        return MaxIO._iono._pwmGet().set(self._num - 1, freq, duty_u16)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING):
+        MaxIO._iono._eventsGet().irq(self, self._num - 1, handler, trigger)
+
+    def wait_edge(self, rising=True, timeout_ms=None):
+        from iono_d16.aio import wait_edge
+        return wait_edge(self, rising, timeout_ms)
+
+    def counter(self, mode=COUNT_RISING, window_ms=1000):
+        MaxIO._iono._countersGet().config(self._num - 1, mode, window_ms)
+
+    def count(self, reset=False):
+        return MaxIO._iono._countersGet().count(self._num - 1, reset)
+
+    def frequency(self):
+        return MaxIO._iono._countersGet().frequency(self._num - 1)
+
+    def period_us(self):
+        return MaxIO._iono._countersGet().period_us(self._num - 1)
+
+    def on_time_ms(self, reset=False):
+        return MaxIO._iono._countersGet().on_time_ms(self._num - 1, reset)
 
     def _read(self):
-        return (self._maxIn._inputs >> self._inIdx) & 1
+        return (MaxIO._state.word(IMG_INPUTS) >> (self._num - 1)) & 1
 
     def _write(self, val):
         if self._mode != PinMode.OUT_HS and self._mode != PinMode.OUT_PP:
@@ -160,53 +209,42 @@ class MaxIO:
     def off(self):
         return self.value(False)
 
+    def _fault(self, idx):
+        # Read-and-clear of a fault memory bit: the clear is applied by the
+        # next Iono.process() and only if the fault was seen
+        mask = 1 << (self._num - 1)
+        st = MaxIO._state
+        if st.word(idx) & mask and not (st.pending(idx) & mask):
+            st.postClear(idx, mask)
+            return 1
+        return 0
+
     def wire_break(self):
-        ret = getBit(self._maxIn._faultMemWb, self._inIdx)
-        self._maxIn._faultMemWb = \
-                setBit(self._maxIn._faultMemWb, self._inIdx, False)
-        return ret
+        return self._fault(IMG_WB)
 
     def open_load(self):
-        ret = getBit(self._maxOut._faultMemOl, self._outIdx)
-        self._maxOut._faultMemOl = \
-                setBit(self._maxOut._faultMemOl, self._outIdx, False)
-        return ret
+        return self._fault(IMG_OL)
 
     def over_voltage(self):
-        ret = getBit(self._maxOut._faultMemOv, self._outIdx)
-        self._maxOut._faultMemOv = \
-                setBit(self._maxOut._faultMemOv, self._outIdx, False)
-        return ret
+        return self._fault(IMG_OV)
 
     def over_voltage_lock(self):
-        return getBit(self._maxOut._ovLock, self._outIdx)
+        return (MaxIO._state.word(IMG_OV_LOCK) >> (self._num - 1)) & 1
 
     def thermal_shutdown(self):
-        if getBit(self._maxOut._faultMemThsd, self._outIdx) or \
-                getBit(self._maxIn._faultMemOtshdn, self._inIdx):
-            ret = 1
-        else:
-            ret = 0
-        self._maxOut._faultMemThsd = \
-                setBit(self._maxOut._faultMemThsd, self._outIdx, False)
-        self._maxIn._faultMemOtshdn = \
-                setBit(self._maxIn._faultMemOtshdn, self._inIdx, False)
-        return ret
+        return self._fault(IMG_THSD)
 
     def thermal_shutdown_lock(self):
-        return getBit(self._maxOut._thsdLock, self._outIdx)
+        return (MaxIO._state.word(IMG_THSD_LOCK) >> (self._num - 1)) & 1
+
+    def lock_times(self, ov_ms=None, thsd_ms=None):
+        return self._maxOut.lockTimes(self._outIdx, ov_ms, thsd_ms)
 
     def alarm_t1(self):
-        ret = getBit(self._maxIn._faultMemAlrmT1, self._inIdx)
-        self._maxIn._faultMemAlrmT1 = \
-                setBit(self._maxIn._faultMemAlrmT1, self._inIdx, False)
-        return ret
+        return self._fault(IMG_ALRM_T1)
 
     def alarm_t2(self):
-        ret = getBit(self._maxIn._faultMemAlrmT2, self._inIdx)
-        self._maxIn._faultMemAlrmT2 = \
-                setBit(self._maxIn._faultMemAlrmT2, self._inIdx, False)
-        return ret
+        return self._fault(IMG_ALRM_T2)
 
     def clear_outputs_faults(self):
         self._maxOut._clearFaults = True
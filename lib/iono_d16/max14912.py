@@ -14,8 +14,18 @@ See file LICENSE.txt for further informations on licensing terms.
 '''
 
 from machine import Pin as MPin
+from array import array
 from iono_d16.utils import *
 from iono_d16.spi import *
+from iono_d16.crc import crc14912
+
+# Set to 1 to enable DEBUG() messages
+_DEBUG = const(0)
+# Set to 1 to record the SPI frames in the Trace ring buffer
+_TRACE = const(0)
+
+if _TRACE:
+    from iono_d16.trace import Trace
 
 class Max14912:
     _REG_IN = const(0)
@@ -37,31 +47,20 @@ class Max14912:
     _PROT_OV_LOCK_MS = const(10000)
     _PROT_THSD_LOCK_MS = const(30000)
 
-    def _crcLoop(crc, byte1):
-        for i in range(8):
-            crc <<= 1
-            if crc & 0x80:
-                crc ^= 0xB7  # 0x37 with MSBit on purpose
-            if byte1 & 0x80:
-                crc ^= 1
-            byte1 <<= 1
-        return crc
-
-    def _crc(byte1, byte2):
-        synd = Max14912._crcLoop(0x7f, byte1)
-        synd = Max14912._crcLoop(synd, byte2)
-        return Max14912._crcLoop(synd, 0x80) & 0x7f
-
     _readStatCrc = None
 
     def __init__(self, pinCs):
         if Max14912._readStatCrc is None:
-            Max14912._readStatCrc = Max14912._crc(_CMD_READ_RT_STAT, 0)
+            Max14912._readStatCrc = crc14912(_CMD_READ_RT_STAT, 0)
         self._pinCs = MPin(pinCs, MPin.OUT, None)
         self._pinCs(1)
+        self._frames = SpiFrames(2)
+        if _TRACE:
+            self._csNum = pinCs
         self._error = False
         self._outputs = 0
         self._outputsUser = 0
+        self._cfgOut = 0
         self._clearFaults = False
         self._ovProtEn = False
         self._ol = 0
@@ -78,45 +77,86 @@ class Max14912:
         self._faultMemOl = 0
         self._faultMemOv = 0
         self._faultMemThsd = 0
-        self._lockTs = [0] * 8
+        # Lock duration and expiry time of each output's protections
+        self._ovLockMs = array('i', [_PROT_OV_LOCK_MS] * 8)
+        self._thsdLockMs = array('i', [_PROT_THSD_LOCK_MS] * 8)
+        self._ovExp = array('i', [0] * 8)
+        self._thsdExp = array('i', [0] * 8)
 
     def _spiTransaction(self, wr, data1, data0):
-        zBit = 0x80 if self._clearFaults else 0x00
-        crc = Max14912._crc(zBit | data1, data0)
+        data1 |= 0x80 if self._clearFaults else 0x00
+        crc = crc14912(data1, data0)
+        fr = self._frames
+        buf = fr.buf
+        st = fr.stats
         for i in range(3):
             if i != 0:
-                DEBUG("max14912 repeat")
-            with Spi.mutex:
-                r1, r0, rcrc = Spi.transaction(
-                                    self._pinCs, zBit | data1, data0, crc)
-                if (rcrc & 0x80) == 0x80:
-                    # CRC check of previous transaction
-                    DEBUG("max14912 CRC prev err")
+                st[SPI_RETRIES] += 1
+                if _DEBUG:
+                    DEBUG("max14912 repeat")
+            Spi.lock()
+            try:
+                fr.clear()
+                off = fr.add(self._pinCs, data1, data0, crc)
                 if wr:
-                    r1, r0, rcrc = Spi.transaction(
-                                        self._pinCs, _CMD_READ_RT_STAT,
-                                        0, Max14912._readStatCrc)
-                    if (rcrc & 0x80) == 0x80:
+                    off = fr.add(self._pinCs, _CMD_READ_RT_STAT,
+                                    0, Max14912._readStatCrc)
+                fr.run()
+                if (buf[2] & 0x80) == 0x80:
+                    # CRC check of previous transaction
+                    st[SPI_CRC_PREV] += 1
+                    if _DEBUG:
+                        DEBUG("max14912 CRC prev err")
+                if wr and (buf[off + 2] & 0x80) == 0x80:
+                    st[SPI_CRC] += 1
+                    if _DEBUG:
                         DEBUG("max14912 CRC err")
-                        continue
-            if (rcrc & 0x7f) == Max14912._crc(r1, r0):
-                if zBit == 0x80:
-                    self._clearFaults = False
-                return (r1, r0)
+                    if _TRACE:
+                        self._trace(i, data1, data0, crc, Trace.F_CRC)
+                    continue
+                if (buf[off + 2] & 0x7f) == crc14912(buf[off], buf[off + 1]):
+                    if _TRACE:
+                        self._trace(i, data1, data0, crc, 0)
+                    if data1 & 0x80:
+                        self._clearFaults = False
+                    return (buf[off] << 8) | buf[off + 1]
+                st[SPI_CRC] += 1
+                if _TRACE:
+                    self._trace(i, data1, data0, crc, Trace.F_CRC)
+            finally:
+                Spi.mutex.release()
+        st[SPI_FAILURES] += 1
         raise Exception("max14912 i2c error")
 
+    if _TRACE:
+        def _trace(self, attempt, data1, data0, crc, flags):
+            buf = self._frames.buf
+            if attempt != 0:
+                flags |= Trace.F_RETRY
+            if attempt == 2 and (flags & Trace.F_CRC):
+                flags |= Trace.F_FAIL
+            if (buf[2] & 0x80) == 0x80:
+                flags |= Trace.F_CRC_PREV
+            Trace.frame(self._csNum, data1, data0, crc, buf, 0, flags)
+            if self._frames._n > 1:
+                Trace.frame(self._csNum, _CMD_READ_RT_STAT, 0,
+                            Max14912._readStatCrc, buf, 3, flags)
+
     def _readReg(self, regAddr):
-        DEBUG(f"max14912 {self._pinCs} read reg={regAddr}")
+        # Returns the register's two bytes as a 16-bit word
+        if _DEBUG:
+            DEBUG(f"max14912 {self._pinCs} read reg={regAddr}")
         try:
-            dataA, dataQ = self._spiTransaction(True, _CMD_READ_REG, regAddr)
+            data = self._spiTransaction(True, _CMD_READ_REG, regAddr)
             self._error = False
-            return (dataA, dataQ)
+            return data
         except Exception as e:
             self._error = True
             raise e
 
     def _cmd(self, cmd, data):
-        DEBUG(f"max14912 {self._pinCs} cmd={cmd} data=0x{data:x}")
+        if _DEBUG:
+            DEBUG(f"max14912 {self._pinCs} cmd={cmd} data=0x{data:x}")
         try:
             self._spiTransaction(False, cmd, data)
             return True
@@ -124,11 +164,11 @@ class Max14912:
             return False
 
     def _config(self, cmd, checkRegAddr, val):
-        DEBUG(f"max14912 {self._pinCs} cfg cmd={cmd} chReg={checkRegAddr} val=0x{val:x}")
+        if _DEBUG:
+            DEBUG(f"max14912 {self._pinCs} cfg cmd={cmd} chReg={checkRegAddr} val=0x{val:x}")
         if not self._cmd(cmd, val):
             return False
-        _, cfg = self._readReg(checkRegAddr)
-        if cfg != val:
+        if (self._readReg(checkRegAddr) & 0xff) != val:
             return False
         return True
 
@@ -140,33 +180,62 @@ class Max14912:
         self._cfgModePP = setBit(self._cfgModePP, idx, val)
         return self._config(_CMD_SET_MODE, _REG_PP, self._cfgModePP)
 
+    def _lockUpdate(self, rt, lock, exp, lockMs, now):
+        # Restarts the lock of the outputs in rt, returns the mask of the
+        # locked outputs not in rt whose lock expired
+        expired = 0
+        pend = rt | lock
+        idx = 0
+        while pend:
+            if pend & 1:
+                if (rt >> idx) & 1:
+                    exp[idx] = time.ticks_add(now, lockMs[idx])
+                elif time.ticks_diff(now, exp[idx]) > 0:
+                    expired |= 1 << idx
+            pend >>= 1
+            idx += 1
+        return expired
+
     def _overVoltProt(self):
-        for oi in range(8):
-            if getBit(self._ovRT, oi) and not getBit(self._cfgModePP, oi):
-                self._ovLock = setBit(self._ovLock, oi, True)
-                if not getBit(self._outputs, oi) and not getBit(self._thsdLock, oi):
-                    self._outputSet(oi, True)
-                self._lockTs[oi] = time.ticks_ms()
-            elif getBit(self._ovLock, oi):
-                if time.ticks_diff(time.ticks_ms(), self._lockTs[oi]) > _PROT_OV_LOCK_MS:
-                    if not getBit(self._thsdLock, oi):
-                        self._outputSet(oi, getBit(self._outputsUser, oi))
-                    self._ovLock = setBit(self._ovLock, oi, False)
+        rt = self._ovRT & ~self._cfgModePP
+        if not (rt | self._ovLock):
+            return
+        thsdLock = self._thsdLock
+        rel = self._lockUpdate(rt, self._ovLock, self._ovExp,
+                                self._ovLockMs, time.ticks_ms())
+        self._ovLock = (self._ovLock | rt) & ~rel
+        # Over-voltage outputs are switched on, released ones restored
+        outputs = self._outputs | (rt & ~thsdLock)
+        rel &= ~thsdLock
+        outputs = (outputs & ~rel) | (self._outputsUser & rel)
+        if outputs != self._outputs:
+            self._outputs = outputs
+            self._cmd(_CMD_SET_STATE, outputs)
 
     def _thermalProt(self):
-        for oi in range(8):
-            if getBit(self._thsdRT, oi):
-                self._thsdLock = setBit(self._thsdLock, oi, True)
-                if getBit(self._cfgModePP, oi):
-                    self._modePPSet(oi, False)
-                if getBit(self._outputs, oi):
-                    self._outputSet(oi, False)
-                self._lockTs[oi] = time.ticks_ms()
-            elif getBit(self._thsdLock, oi):
-                if time.ticks_diff(time.ticks_ms(), self._lockTs[oi]) > _PROT_THSD_LOCK_MS:
-                    self._modePPSet(oi, getBit(self._cfgModePPUser, oi))
-                    self._outputSet(oi, getBit(self._outputsUser, oi))
-                    self._thsdLock = setBit(self._thsdLock, oi, False)
+        rt = self._thsdRT
+        if not (rt | self._thsdLock):
+            return
+        rel = self._lockUpdate(rt, self._thsdLock, self._thsdExp,
+                                self._thsdLockMs, time.ticks_ms())
+        self._thsdLock = (self._thsdLock | rt) & ~rel
+        # Shut down outputs are switched off in high-side mode, released
+        # ones restored
+        modePP = (self._cfgModePP & ~(rt | rel)) | (self._cfgModePPUser & rel)
+        outputs = (self._outputs & ~(rt | rel)) | (self._outputsUser & rel)
+        if modePP != self._cfgModePP:
+            self._cfgModePP = modePP
+            self._config(_CMD_SET_MODE, _REG_PP, modePP)
+        if outputs != self._outputs:
+            self._outputs = outputs
+            self._cmd(_CMD_SET_STATE, outputs)
+
+    def lockTimes(self, idx, ovMs, thsdMs):
+        if ovMs is not None:
+            self._ovLockMs[idx] = ovMs
+        if thsdMs is not None:
+            self._thsdLockMs[idx] = thsdMs
+        return (self._ovLockMs[idx], self._thsdLockMs[idx])
 
     def modeProtected(self, idx, pp, ol):
         self._cfgOlDet = setBit(self._cfgOlDet, idx, ol)
@@ -183,6 +252,60 @@ class Max14912:
             return False
         return self._outputSet(idx, val)
 
+    def writeMaskProtected(self, mask, vals):
+        # Sets the outputs selected by mask with a single SET_STATE,
+        # skipping the ones not configured as outputs or locked
+        ok = (mask & ~self._cfgOut) == 0
+        mask &= self._cfgOut
+        self._outputsUser = (self._outputsUser & ~mask) | (vals & mask)
+        locked = self._ovLock | self._thsdLock
+        if mask & locked:
+            ok = False
+            mask &= ~locked
+        if mask:
+            self._outputs = (self._outputs & ~mask) | (vals & mask)
+            ok = self._cmd(_CMD_SET_STATE, self._outputs) and ok
+        return ok
+
+    def configure(self, mask, pp, ol, outs, join):
+        # Applies the modes of the outputs in mask, writing each register
+        # once and only if changed. join is the new join config or None
+        ok = True
+        # The cached values are updated once written, so that the ones
+        # failing are written again by the next call
+        olDet = (self._cfgOlDet & ~mask) | (ol & mask)
+        if olDet != self._cfgOlDet:
+            if not self._config(_CMD_SET_OL_DET, _REG_OL_EN, olDet):
+                return False
+            self._cfgOlDet = olDet
+        self._cfgModePPUser = (self._cfgModePPUser & ~mask) | (pp & mask)
+        locked = self._ovLock | self._thsdLock
+        if mask & locked:
+            ok = False
+        modePP = (self._cfgModePP & locked) | (self._cfgModePPUser & ~locked)
+        if modePP != self._cfgModePP:
+            if not self._config(_CMD_SET_MODE, _REG_PP, modePP):
+                return False
+            self._cfgModePP = modePP
+        # Outputs turning to inputs are switched off
+        off = mask & ~outs
+        self._outputsUser &= ~off
+        outputs = self._outputs & ~(off & ~locked)
+        if outputs != self._outputs:
+            if not self._cmd(_CMD_SET_STATE, outputs):
+                return False
+            self._outputs = outputs
+        if join is not None and join != self._cfgJoin:
+            if not self._config(_CMD_SET_CONFIG, _REG_WD_JN, join):
+                return False
+            self._cfgJoin = join
+        if outs & mask:
+            self._ovProtEn = True
+        if ok:
+            # Along with the pins' modes, see Iono.configure()
+            self._cfgOut = (self._cfgOut & ~mask) | (outs & mask)
+        return ok
+
     def join(self, idx, join):
         bitIdx = 2 if (idx <= 3) else 3
         self._cfgJoin = setBit(self._cfgJoin, bitIdx, join)
@@ -191,11 +314,13 @@ class Max14912:
         return True
 
     def updateOl(self):
-        self._olRT, self._ol = self._readReg(_REG_OL)
+        data = self._readReg(_REG_OL)
+        self._olRT = data >> 8
+        self._ol = data & 0xff
         self._faultMemOl |= self._olRT
 
     def updateOv(self):
-        self._ovRT, _ = self._readReg(_REG_OV)
+        self._ovRT = self._readReg(_REG_OV) >> 8
         self._faultMemOv |= self._ovRT
         if self._ovProtEn:
             self._overVoltProt()
@@ -204,6 +329,8 @@ class Max14912:
         self._cmd(_CMD_SET_STATE, self._outputs)
 
     def updateThsd(self):
-        self._thsdRT, self._thsd = self._readReg(_REG_THSD)
+        data = self._readReg(_REG_THSD)
+        self._thsdRT = data >> 8
+        self._thsd = data & 0xff
         self._faultMemThsd |= self._thsdRT
         self._thermalProt()
@@ -16,6 +16,15 @@ See file LICENSE.txt for further informations on licensing terms.
 from machine import Pin as MPin
 from iono_d16.utils import *
 from iono_d16.spi import *
+from iono_d16.crc import crc22190
+
+# Set to 1 to enable DEBUG() messages
+_DEBUG = const(0)
+# Set to 1 to record the SPI frames in the Trace ring buffer
+_TRACE = const(0)
+
+if _TRACE:
+    from iono_d16.trace import Trace
 
 class Max22190:
     _REG_WB = const(0x00)
@@ -23,34 +32,19 @@ class Max22190:
     _REG_FAULT2 = const(0x1C)
     _REG_FLT1 = const(0x06)
     _REG_FAULT2EN = const(0x1E)
+    # Highest filter setting, bypass
+    _FLT_MAX = const(8)
 
-    def _crc(data2, data1, data0):
-        length = 19          # 19-bit data
-        crc_init = 0x07      # 5-bit init word, constant, 00111
-        crc_poly = 0x35      # 6-bit polynomial, constant, 110101
-        crc_step = 0
-        tmp = 0
-
-        datainput = (data2 << 16) + (data1 << 8) + data0
-        datainput = (datainput & 0xffffe0) + crc_init
-        tmp = ((datainput & 0xfc0000) >> 18) & 0xff
-        if tmp & 0x20 == 0x20:
-            crc_step = (tmp ^ crc_poly) & 0xff
-        else:
-            crc_step = tmp
-
-        for i in range(length - 1):
-            tmp = (((crc_step & 0x1f) << 1) + ((datainput >> (length - 2 - i)) & 0x01)) & 0xff
-            if tmp & 0x20 == 0x20:
-                crc_step = (tmp ^ crc_poly) & 0xff
-            else:
-                crc_step = tmp
-
-        return crc_step & 0x1f
+    _wbCrc = None
 
     def __init__(self, pinCs):
+        if Max22190._wbCrc is None:
+            Max22190._wbCrc = crc22190(_REG_WB, 0, 0)
         self._pinCs = MPin(pinCs, MPin.OUT, None)
         self._pinCs(1)
+        self._frames = SpiFrames(1)
+        if _TRACE:
+            self._csNum = pinCs
         self._error = False
         self._inputs = 0
         self._wb = 0
@@ -66,29 +60,56 @@ class Max22190:
         return self._writeReg(_REG_FAULT2EN, 0x3f)
 
     def _spiTransaction(self, data1, data0):
-        crc = Max22190._crc(data1, data0, 0)
+        crc = crc22190(data1, data0, 0)
+        fr = self._frames
+        buf = fr.buf
+        st = fr.stats
         for i in range(3):
             if (i != 0):
-                DEBUG("max22190 repeat")
-            with Spi.mutex:
-                r1, r0, rcrc = Spi.transaction(self._pinCs, data1, data0, crc)
-            if ((rcrc & 0x1f) == Max22190._crc(r1, r0, rcrc)):
-                return (r1, r0)
+                st[SPI_RETRIES] += 1
+                if _DEBUG:
+                    DEBUG("max22190 repeat")
+            Spi.lock()
+            try:
+                fr.clear()
+                fr.add(self._pinCs, data1, data0, crc)
+                fr.run()
+                if ((buf[2] & 0x1f) == crc22190(buf[0], buf[1], buf[2])):
+                    if _TRACE:
+                        self._trace(i, data1, data0, crc, 0)
+                    return (buf[0] << 8) | buf[1]
+                st[SPI_CRC] += 1
+                if _TRACE:
+                    self._trace(i, data1, data0, crc, Trace.F_CRC)
+            finally:
+                Spi.mutex.release()
+        st[SPI_FAILURES] += 1
         raise Exception("max22190 i2c error")
 
+    if _TRACE:
+        def _trace(self, attempt, data1, data0, crc, flags):
+            if attempt != 0:
+                flags |= Trace.F_RETRY
+            if attempt == 2 and (flags & Trace.F_CRC):
+                flags |= Trace.F_FAIL
+            Trace.frame(self._csNum, data1, data0, crc,
+                        self._frames.buf, 0, flags)
+
     def _readReg(self, regAddr):
-        DEBUG(f"max22190 {self._pinCs} read reg={regAddr}")
+        if _DEBUG:
+            DEBUG(f"max22190 {self._pinCs} read reg={regAddr}")
         try:
-            data1, data0 = self._spiTransaction(regAddr, 0)
+            data = self._spiTransaction(regAddr, 0)
             self._error = False
-            self._inputs = data1
-            return data0
+            self._inputs = data >> 8
+            return data & 0xff
         except Exception as e:
             self._error = True
             raise e
 
     def _writeReg(self, regAddr, val):
-        DEBUG(f"max22190 {self._pinCs} write reg={regAddr} val=0x{val:x}")
+        if _DEBUG:
+            DEBUG(f"max22190 {self._pinCs} write reg={regAddr} val=0x{val:x}")
         self._spiTransaction(0x80 | regAddr, val)
         return self._readReg(regAddr) == val
 
@@ -97,10 +118,68 @@ class Max22190:
         self._cfgFlt[idx] = (self._cfgFlt[idx] & 0x0f) | (0x10 if wb else 0x00)
         return self._writeReg(regAddr, self._cfgFlt[idx])
 
+    def validFilter(flt):
+        return isinstance(flt, int) and 0 <= flt <= _FLT_MAX
+
+    def filter(self, idx, flt):
+        if not Max22190.validFilter(flt):
+            return False
+        regAddr = _REG_FLT1 + (idx * 2)
+        self._cfgFlt[idx] = (self._cfgFlt[idx] & 0x10) | (flt & 0x0f)
+        return self._writeReg(regAddr, self._cfgFlt[idx])
+
+    def configure(self, mask, wb, flt):
+        # Writes the FLT registers of the inputs in mask, once and only if
+        # changed. flt holds the filter of each input, None to keep it
+        ok = True
+        for idx in range(8):
+            if mask & (1 << idx):
+                cur = self._cfgFlt[idx]
+                val = (0x10 if wb & (1 << idx) else 0x00) | \
+                        ((cur if flt[idx] is None else flt[idx]) & 0x0f)
+                if val != cur:
+                    try:
+                        done = self._writeReg(_REG_FLT1 + (idx * 2), val)
+                    except:
+                        done = False
+                    # Cached once written, to be written again otherwise
+                    if done:
+                        self._cfgFlt[idx] = val
+                    else:
+                        ok = False
+        return ok
+
     def updateWb(self):
         self._wb = self._readReg(_REG_WB)
         self._faultMemWb |= self._wb
 
+    def addWbRead(self, fr):
+        # Queues the WB register read in frames shared with the other
+        # chip, to be followed by wbReply() after fr.run(), all with Spi.mutex
+        # held
+        return fr.add(self._pinCs, _REG_WB, 0, Max22190._wbCrc)
+
+    def wbReply(self, buf, off):
+        # Returns False on CRC error, in which case updateWb() is to be
+        # called to read again with retries
+        st = self._frames.stats
+        st[SPI_FRAMES] += 1
+        if (buf[off + 2] & 0x1f) != crc22190(buf[off], buf[off + 1],
+                                                buf[off + 2]):
+            st[SPI_CRC] += 1
+            st[SPI_RETRIES] += 1
+            if _TRACE:
+                Trace.frame(self._csNum, _REG_WB, 0, Max22190._wbCrc,
+                            buf, off, Trace.F_CRC)
+            return False
+        if _TRACE:
+            Trace.frame(self._csNum, _REG_WB, 0, Max22190._wbCrc, buf, off, 0)
+        self._error = False
+        self._inputs = buf[off]
+        self._wb = buf[off + 1]
+        self._faultMemWb |= self._wb
+        return True
+
     def updateFault1(self):
         self._fault1 = self._readReg(_REG_FAULT1)
         self._faultMemAlrmT1 |= 0xff if getBit(self._fault1, 3) else 0x00
@@ -110,3 +189,7 @@ class Max22190:
         if getBit(self._fault1, 5):
             self._fault2 = self._readReg(_REG_FAULT2)
             self._faultMemOtshdn |= 0xff if getBit(self._fault2, 4) else 0x00
+
+    def updateFaults(self):
+        self.updateFault1()
+        self.updateFault2()
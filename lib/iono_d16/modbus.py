@@ -0,0 +1,222 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from micropython import const
+import time
+from iono_d16 import Iono
+from iono_d16.state import IMG_INPUTS, IMG_WB
+from iono_d16.crc import crc16
+
+_BUF_SIZE = const(256)
+
+_EX_ILLEGAL_FUNCTION = const(1)
+_EX_ILLEGAL_ADDRESS = const(2)
+_EX_ILLEGAL_VALUE = const(3)
+_EX_DEVICE_FAILURE = const(4)
+
+class ModbusSlave:
+    # Coils and discrete inputs: 0-15 = D1-D16
+    # Holding registers: 0 = outputs
+    # Input registers: 0 = inputs, 1 = outputs, 2-9 = faults (wire-break,
+    # open-load, over-voltage, over-voltage lock, thermal shutdown,
+    # thermal shutdown lock, alarm T1, alarm T2), 16-47 = D1-D16 counters
+    # (32-bit, high word first)
+    IR_INPUTS = const(0)
+    IR_OUTPUTS = const(1)
+    IR_FAULTS = const(2)
+    IR_COUNTERS = const(16)
+
+    def __init__(self, address, port=None):
+        self._addr = address
+        self._port = Iono.RS485 if port is None else port
+        self._rx = bytearray(_BUF_SIZE)
+        self._tx = bytearray(_BUF_SIZE)
+        if self._port._baudrate > 19200:
+            # Fixed t3.5 for high baud rates, as per specification
+            self._port.idle_us(1750)
+        self._reset()
+
+    def process(self):
+        # Call periodically, serves at most one request
+        n = self._port.recv(self._rx)
+        if n == 0:
+            return False
+        self._rxTs = time.ticks_us()
+        return self._handle(n)
+
+    def _handle(self, n):
+        rx = self._rx
+        if n < 4:
+            self._badFrames += 1
+            return False
+        if crc16(rx, n - 2) != rx[n - 2] | (rx[n - 1] << 8):
+            self._crcErrors += 1
+            return False
+        addr = rx[0]
+        if addr != self._addr and addr != 0:
+            return False
+        self._frames += 1
+        tx = self._tx
+        tx[0] = self._addr
+        tx[1] = rx[1]
+        ret = self._function(rx, n, tx)
+        if ret < 0:
+            self._exceptions += 1
+            tx[1] = rx[1] | 0x80
+            tx[2] = -ret
+            ret = 3
+        if addr == 0:
+            # Broadcast, no reply
+            return True
+        crc = crc16(tx, ret)
+        tx[ret] = crc & 0xff
+        tx[ret + 1] = crc >> 8
+        self._port.send(tx, ret + 2)
+        dt = time.ticks_diff(time.ticks_us(), self._rxTs)
+        self._turnaroundLast = dt
+        if dt > self._turnaroundMax:
+            self._turnaroundMax = dt
+        return True
+
+    def _coils(self):
+        return Iono._maxOutL._outputsUser | (Iono._maxOutH._outputsUser << 8)
+
+    def _outputsMask(self):
+        return Iono._maxOutL._cfgOut | (Iono._maxOutH._cfgOut << 8)
+
+    def _inReg(self, reg):
+        st = Iono._state
+        if reg == IR_INPUTS:
+            return st.word(IMG_INPUTS)
+        if reg == IR_OUTPUTS:
+            return self._coils()
+        reg -= IR_FAULTS
+        if 0 <= reg < 8:
+            # Same order as the fault words of the state image
+            return st.word(IMG_WB + reg)
+        reg -= IR_COUNTERS - IR_FAULTS
+        if 0 <= reg < 32:
+            c = Iono._countersGet()._count[reg >> 1]
+            return (c & 0xffff) if reg & 1 else (c >> 16)
+        return -1
+
+    def _echo(self, rx, tx):
+        for i in range(2, 6):
+            tx[i] = rx[i]
+        return 6
+
+    def _function(self, rx, n, tx):
+        # Writes the reply data into tx, returns its length or the
+        # negated exception code
+        fc = rx[1]
+        if fc == 0 or (fc > 6 and fc != 15 and fc != 16):
+            return -_EX_ILLEGAL_FUNCTION
+        if n < 8:
+            return -_EX_ILLEGAL_VALUE
+        start = (rx[2] << 8) | rx[3]
+        qty = (rx[4] << 8) | rx[5]
+        if fc == 1 or fc == 2:
+            if qty < 1 or qty > 2000:
+                return -_EX_ILLEGAL_VALUE
+            if start + qty > 16:
+                return -_EX_ILLEGAL_ADDRESS
+            bits = self._coils() if fc == 1 else Iono._state.word(IMG_INPUTS)
+            bits = (bits >> start) & ((1 << qty) - 1)
+            nb = (qty + 7) >> 3
+            tx[2] = nb
+            tx[3] = bits & 0xff
+            tx[4] = bits >> 8
+            return 3 + nb
+        if fc == 3 or fc == 4:
+            if qty < 1 or qty > 125:
+                return -_EX_ILLEGAL_VALUE
+            if fc == 3 and start + qty > 1:
+                return -_EX_ILLEGAL_ADDRESS
+            tx[2] = qty * 2
+            for i in range(qty):
+                v = self._coils() if fc == 3 else self._inReg(start + i)
+                if v < 0:
+                    return -_EX_ILLEGAL_ADDRESS
+                tx[3 + i * 2] = v >> 8
+                tx[4 + i * 2] = v & 0xff
+            return 3 + qty * 2
+        if fc == 5:
+            if qty != 0xff00 and qty != 0:
+                return -_EX_ILLEGAL_VALUE
+            if start >= 16:
+                return -_EX_ILLEGAL_ADDRESS
+            mask = 1 << start
+            if mask & ~self._outputsMask():
+                # Not configured as output
+                return -_EX_ILLEGAL_ADDRESS
+            if not Iono.write_outputs(mask, mask if qty else 0):
+                return -_EX_DEVICE_FAILURE
+            return self._echo(rx, tx)
+        if fc == 6:
+            if start != 0:
+                return -_EX_ILLEGAL_ADDRESS
+            if not Iono.write_outputs(self._outputsMask(), qty):
+                return -_EX_DEVICE_FAILURE
+            return self._echo(rx, tx)
+        if fc == 15 or fc == 16:
+            nb = rx[6]
+            if n < 9 + nb:
+                return -_EX_ILLEGAL_VALUE
+            if fc == 15:
+                if qty < 1 or qty > 1968 or nb != (qty + 7) >> 3:
+                    return -_EX_ILLEGAL_VALUE
+                if start + qty > 16:
+                    return -_EX_ILLEGAL_ADDRESS
+                vals = rx[7] | ((rx[8] << 8) if nb > 1 else 0)
+                mask = ((1 << qty) - 1) << start
+                if mask & ~self._outputsMask():
+                    return -_EX_ILLEGAL_ADDRESS
+                vals <<= start
+            else:
+                if qty < 1 or qty > 123 or nb != qty * 2:
+                    return -_EX_ILLEGAL_VALUE
+                if start + qty > 1:
+                    return -_EX_ILLEGAL_ADDRESS
+                mask = self._outputsMask()
+                vals = (rx[7] << 8) | rx[8]
+            if not Iono.write_outputs(mask, vals):
+                return -_EX_DEVICE_FAILURE
+            return self._echo(rx, tx)
+        return -_EX_ILLEGAL_FUNCTION
+
+    def _reset(self):
+        self._frames = 0
+        self._crcErrors = 0
+        self._badFrames = 0
+        self._exceptions = 0
+        self._turnaroundLast = 0
+        self._turnaroundMax = 0
+        self._statsTs = time.ticks_ms()
+        self._statsFrames = 0
+
+    def stats(self, reset=False):
+        # Returns (frames, crc_errors, bad_frames, exceptions,
+        # turnaround_last_us, turnaround_max_us, frames_per_s), the
+        # frames rate is averaged since the previous call
+        now = time.ticks_ms()
+        dt = time.ticks_diff(now, self._statsTs)
+        fps = (self._frames - self._statsFrames) * 1000 / dt if dt > 0 else 0
+        ret = (self._frames, self._crcErrors, self._badFrames,
+                self._exceptions, self._turnaroundLast, self._turnaroundMax,
+                fps)
+        self._statsTs = now
+        self._statsFrames = self._frames
+        if reset:
+            self._reset()
+        return ret
@@ -0,0 +1,80 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+from array import array
+import time
+from iono_d16.driver import ProcessDriver
+
+class ScanCycle:
+    def __init__(self, iono, logic, scanUs):
+        self._iono = iono
+        self._logic = logic
+        self._scanUs = scanUs
+        # Process images, bit 0 = D1 ... bit 15 = D16
+        self.inputs = array('H', [0])
+        self.outputs = array('H', [0])
+        self._driver = ProcessDriver(self.scan)
+        self._reset()
+
+    def _reset(self):
+        self._count = 0
+        self._overruns = 0
+        self._avg = 0
+        self._max = 0
+
+    def run(self):
+        iono = self._iono
+        # Start from the current outputs, not to drop them on the first
+        # scan if the logic does not set them all
+        self.outputs[0] = iono._maxOutL._outputsUser | \
+                (iono._maxOutH._outputsUser << 8)
+        self._driver.run_loop(self._scanUs)
+
+    def stop(self):
+        self._driver.stop()
+
+    def scan(self):
+        t = time.ticks_us()
+        iono = self._iono
+        iono._scan()
+        self.inputs[0] = iono._inWord
+        self._logic(self.inputs, self.outputs)
+        # One SET_STATE per chip with outputs configured
+        vals = self.outputs[0]
+        outL = iono._maxOutL
+        outH = iono._maxOutH
+        if outL._cfgOut:
+            outL.writeMaskProtected(outL._cfgOut, vals & 0xff)
+        if outH._cfgOut:
+            outH.writeMaskProtected(outH._cfgOut, vals >> 8)
+        iono._maintain()
+        iono._publish()
+        dt = time.ticks_diff(time.ticks_us(), t)
+        if self._count == 0:
+            self._avg = dt
+        self._avg += (dt - self._avg) >> 4
+        if dt > self._max:
+            self._max = dt
+        if dt > self._scanUs:
+            self._overruns += 1
+        self._count += 1
+
+    def stats(self, reset=False):
+        ret = (self._count, self._overruns, self._avg, self._max,
+                self._driver.stats()[6])
+        if reset:
+            self._reset()
+            self._driver.stats(True)
+        return ret
@@ -0,0 +1,170 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from array import array
+import _thread
+import time
+
+class SoftPwm:
+    def __init__(self, maxOutL, maxOutH):
+        self._maxOutL = maxOutL
+        self._maxOutH = maxOutH
+        self._lock = _thread.allocate_lock()
+        self._period = array('i', [0] * 16)
+        self._duty = array('i', [0] * 16)
+        self._start = array('i', [0] * 16)
+        self._next = array('i', [0] * 16)
+        # Active channels sorted by next edge time
+        self._order = bytearray(16)
+        self._n = 0
+        self._active = 0
+        self._on = 0
+        self._missed = 0
+        self._lastTs = time.ticks_us()
+        self._intervalAvg = 0
+        self._intervalMax = 0
+
+    def _write(self, mask, vals):
+        if mask & 0xff:
+            self._maxOutL.writeMaskProtected(mask & 0xff, vals & 0xff)
+        if mask & 0xff00:
+            self._maxOutH.writeMaskProtected(mask >> 8, vals >> 8)
+
+    def _remove(self, ch):
+        if self._active & (1 << ch):
+            order = self._order
+            n = self._n - 1
+            i = 0
+            while order[i] != ch:
+                i += 1
+            while i < n:
+                order[i] = order[i + 1]
+                i += 1
+            self._n = n
+            self._active &= ~(1 << ch)
+
+    def _sort(self, now):
+        order = self._order
+        nxt = self._next
+        for i in range(1, self._n):
+            ch = order[i]
+            dt = time.ticks_diff(nxt[ch], now)
+            j = i - 1
+            while j >= 0 and time.ticks_diff(nxt[order[j]], now) > dt:
+                order[j + 1] = order[j]
+                j -= 1
+            order[j + 1] = ch
+
+    def set(self, ch, freq, duty_u16):
+        if freq <= 0 or duty_u16 < 0:
+            return False
+        mask = 1 << ch
+        period = 1000000 // freq
+        duty = period * duty_u16 // 65535
+        with self._lock:
+            self._remove(ch)
+            if duty <= 0 or duty >= period:
+                val = 0 if duty <= 0 else mask
+            else:
+                now = time.ticks_us()
+                if self._n == 0:
+                    # Not measuring the time spent with no active PWM
+                    self._lastTs = now
+                self._period[ch] = period
+                self._duty[ch] = duty
+                self._start[ch] = now
+                self._next[ch] = time.ticks_add(now, duty)
+                self._order[self._n] = ch
+                self._n += 1
+                self._active |= mask
+                self._sort(now)
+                val = mask
+            self._on = (self._on & ~mask) | val
+            self._write(mask, val)
+        return True
+
+    def stop(self, ch):
+        with self._lock:
+            self._remove(ch)
+
+    def sync(self, mask):
+        # Restarts the period of the selected channels at the same time
+        with self._lock:
+            mask &= self._active
+            if mask == 0:
+                return
+            now = time.ticks_us()
+            for ch in range(16):
+                if mask & (1 << ch):
+                    self._start[ch] = now
+                    self._next[ch] = time.ticks_add(now, self._duty[ch])
+            self._sort(now)
+            self._on |= mask
+            self._write(mask, mask)
+
+    def process(self):
+        if self._n == 0:
+            return
+        now = time.ticks_us()
+        dt = time.ticks_diff(now, self._lastTs)
+        self._lastTs = now
+        self._intervalAvg += (dt - self._intervalAvg) >> 4
+        if dt > self._intervalMax:
+            self._intervalMax = dt
+        if time.ticks_diff(self._next[self._order[0]], now) > 0:
+            return
+        with self._lock:
+            order = self._order
+            changed = 0
+            on = self._on
+            for i in range(self._n):
+                ch = order[i]
+                if time.ticks_diff(self._next[ch], now) > 0:
+                    break
+                mask = 1 << ch
+                period = self._period[ch]
+                duty = self._duty[ch]
+                d = time.ticks_diff(now, self._start[ch])
+                k = d // period
+                if k > 0:
+                    d -= k * period
+                    self._start[ch] = time.ticks_add(self._start[ch],
+                                                        k * period)
+                # Edges since the current state was set, more than one
+                # means some were not serviced in time
+                edges = 2 * k + (1 if d >= duty else 0) - \
+                        (0 if on & mask else 1)
+                if edges > 1:
+                    self._missed += edges - 1
+                if d < duty:
+                    self._next[ch] = time.ticks_add(self._start[ch], duty)
+                    if not on & mask:
+                        changed |= mask
+                        on |= mask
+                else:
+                    self._next[ch] = time.ticks_add(self._start[ch], period)
+                    if on & mask:
+                        changed |= mask
+                        on &= ~mask
+            self._sort(now)
+            self._on = on
+            if changed:
+                self._write(changed, on)
+
+    def stats(self, reset=False):
+        ret = (self._intervalAvg, self._intervalMax, self._missed)
+        if reset:
+            self._intervalMax = 0
+            self._missed = 0
+        return ret
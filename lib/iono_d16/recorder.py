@@ -0,0 +1,204 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from micropython import const
+from machine import Pin as MPin
+from array import array
+import time
+from iono_d16.state import *
+
+# Dump format, all little-endian. Header: 'IREC', version, flags,
+# record size, records count (4 bytes), index of the trigger record
+# (4 bytes, 0xffffffff if none)
+REC_HDR_SIZE = const(16)
+REC_VERSION = const(1)
+REC_HDR_CHANGES = const(0x01)
+REC_HDR_TRIGGERED = const(0x02)
+# Record: us since the previous record (4 bytes), D inputs word (2 bytes,
+# bit 0 = D1), flags (DT1 ... DT4 levels in bits 0-3)
+REC_SIZE = const(7)
+REC_TRIGGER = const(0x80)
+
+# Bits of the trigger masks above the D pins
+_DT_SHIFT = const(16)
+
+class Recorder:
+    def __init__(self, samples, changes, dtPins):
+        self._size = samples
+        self._changes = changes
+        self._dtPins = [MPin(p) for p in dtPins]
+        self._us = array('I', [0] * samples)
+        self._word = array('H', [0] * samples)
+        self._flags = bytearray(samples)
+        self._rising = 0
+        self._falling = 0
+        self._faults = 0
+        self._post = samples // 2
+        self._en = False
+        self.start()
+
+    def start(self):
+        # Clears the samples and starts recording, with the trigger armed
+        self._en = False
+        self._idx = 0
+        self._count = 0
+        self._last = -1
+        self._lastTs = 0
+        self._faultsPrev = 0
+        self._trigIdx = -1
+        self._left = -1
+        self._en = True
+
+    def stop(self):
+        self._en = False
+
+    def trigger(self, rising=0, falling=0, faults=0, post=None):
+        if post is None:
+            post = self._size // 2
+        if not (0 <= post < self._size):
+            return False
+        self._rising = rising
+        self._falling = falling
+        self._faults = faults
+        self._post = post
+        return True
+
+    def running(self):
+        return self._en
+
+    def triggered(self):
+        return self._trigIdx >= 0
+
+    def count(self):
+        return self._count
+
+    def sample(self, word, ts, img):
+        # Called by Iono.process() with the inputs word, its timestamp and
+        # the state image
+        flags = 0
+        pins = self._dtPins
+        for i in range(len(pins)):
+            if pins[i].value():
+                flags |= 1 << i
+        cur = word | (flags << _DT_SHIFT)
+        last = self._last
+        if self._left < 0:
+            trig = 0
+            if last >= 0:
+                changed = cur ^ last
+                trig = (changed & cur & self._rising) | \
+                        (changed & last & self._falling)
+            if self._faults:
+                f = img[IMG_WB] | img[IMG_OL] | img[IMG_OV] | \
+                        img[IMG_THSD] | img[IMG_ALRM_T1] | img[IMG_ALRM_T2]
+                trig |= f & ~self._faultsPrev & self._faults
+                self._faultsPrev = f
+            if trig:
+                flags |= REC_TRIGGER
+                self._trigIdx = self._idx
+                self._left = self._post + 1
+        if self._changes and cur == last and not (flags & REC_TRIGGER):
+            return
+        i = self._idx
+        self._us[i] = time.ticks_diff(ts, self._lastTs) if last >= 0 else 0
+        self._word[i] = word
+        self._flags[i] = flags
+        i += 1
+        self._idx = 0 if i == self._size else i
+        if self._count < self._size:
+            self._count += 1
+        self._last = cur
+        self._lastTs = ts
+        if self._left > 0:
+            self._left -= 1
+            if self._left == 0:
+                # Post-trigger window complete, frozen until start()
+                self._en = False
+
+    def dump(self, out=None, chunk=64):
+        # Writes header and records, oldest first, to the out stream in
+        # writes of up to chunk records, or returns them in a bytearray
+        # if out is None. Recording is paused meanwhile
+        en = self._en
+        self._en = False
+        try:
+            n = self._count
+            first = (self._idx - n) % self._size
+            trig = 0xffffffff
+            if self._trigIdx >= 0:
+                trig = (self._trigIdx - first) % self._size
+            hdr = bytearray(REC_HDR_SIZE)
+            hdr[0:4] = b'IREC'
+            hdr[4] = REC_VERSION
+            hdr[5] = (REC_HDR_CHANGES if self._changes else 0) | \
+                    (REC_HDR_TRIGGERED if self._trigIdx >= 0 else 0)
+            hdr[6] = REC_SIZE
+            for k in range(4):
+                hdr[8 + k] = (n >> (k * 8)) & 0xff
+                hdr[12 + k] = (trig >> (k * 8)) & 0xff
+            if out is None:
+                data = bytearray(REC_HDR_SIZE + n * REC_SIZE)
+                data[:REC_HDR_SIZE] = hdr
+                self._pack(data, REC_HDR_SIZE, first, n)
+                return data
+            write = getattr(out, 'send', None) or out.write
+            write(hdr)
+            buf = bytearray(chunk * REC_SIZE)
+            mv = memoryview(buf)
+            done = 0
+            while done < n:
+                m = min(chunk, n - done)
+                self._pack(buf, 0, (first + done) % self._size, m)
+                write(mv[:m * REC_SIZE])
+                done += m
+        finally:
+            self._en = en
+
+    def _pack(self, b, o, i, n):
+        us = self._us
+        word = self._word
+        flags = self._flags
+        size = self._size
+        for _ in range(n):
+            v = us[i]
+            b[o] = v & 0xff
+            b[o + 1] = (v >> 8) & 0xff
+            b[o + 2] = (v >> 16) & 0xff
+            b[o + 3] = (v >> 24) & 0xff
+            v = word[i]
+            b[o + 4] = v & 0xff
+            b[o + 5] = v >> 8
+            b[o + 6] = flags[i]
+            o += REC_SIZE
+            i += 1
+            if i == size:
+                i = 0
+
+    def decode(data):
+        # Yields (us, inputs, dt, trigger) tuples from dumped data, us is
+        # the time since the first record
+        if bytes(data[0:4]) != b'IREC' or data[4] != REC_VERSION:
+            raise ValueError('not a recording')
+        size = data[6]
+        n = data[8] | (data[9] << 8) | (data[10] << 16) | (data[11] << 24)
+        t = 0
+        o = REC_HDR_SIZE
+        for i in range(n):
+            if i != 0:
+                t += data[o] | (data[o + 1] << 8) | (data[o + 2] << 16) | \
+                        (data[o + 3] << 24)
+            f = data[o + 6]
+            yield (t, data[o + 4] | (data[o + 5] << 8), f & 0x0f,
+                    1 if f & REC_TRIGGER else 0)
+            o += size
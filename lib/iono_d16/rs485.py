@@ -0,0 +1,174 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from micropython import const
+from machine import Pin as MPin
+from machine import UART
+from array import array
+import time
+
+# Max number of received frames waiting for recv()
+_RX_FRAMES = const(8)
+# Bytes read from the UART at a time
+_RX_CHUNK = const(16)
+
+class _RS485:
+    PIN_TX = const(16)
+    PIN_RX = const(17)
+    PIN_TXEN_N = const(14)
+
+    def __init__(self):
+        self._txen_n = MPin(PIN_TXEN_N, MPin.OUT)
+        self._rxBuf = bytearray(_RX_CHUNK)
+        self._frames = array('H', [0] * _RX_FRAMES)
+        self._ring = None
+        self.init()
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, idle_us=None,
+                rx_ring=256, **kwargs):
+        self._uart = UART(0, baudrate=baudrate, bits=bits, parity=parity,
+                        stop=stop, tx=MPin(PIN_TX), rx=MPin(PIN_RX), **kwargs)
+        self._baudrate = baudrate
+        # Start, data, parity and stop bits
+        self._charBits = 1 + bits + (0 if parity is None else 1) + stop
+        self._charUs = (self._charBits * 1000000 + baudrate - 1) // baudrate
+        if idle_us is None:
+            # 3.5 characters
+            idle_us = (self._charUs * 7) // 2
+        self._idleUs = idle_us
+        self._hasTxdone = hasattr(self._uart, 'txdone')
+        if self._ring is None or len(self._ring) != rx_ring:
+            self._ring = bytearray(rx_ring)
+        self._head = 0
+        self._tail = 0
+        self._count = 0
+        self._pending = 0
+        self._discard = False
+        self._fHead = 0
+        self._fTail = 0
+        self._fCount = 0
+        self._rxTs = 0
+        self._rxOverflows = 0
+
+    def __getattr__(self, attr):
+        return getattr(self._uart, attr)
+
+    def txen(self, enable):
+        self._txen_n(not enable)
+
+    def idle_us(self, us=None):
+        if us is None:
+            return self._idleUs
+        self._idleUs = us
+
+    def send(self, buf, n=None):
+        if n is None:
+            n = len(buf)
+        self.txen(True)
+        ts = time.ticks_us()
+        # Length passed to write(), not to slice the buffer
+        self._uart.write(buf, n)
+        if self._hasTxdone:
+            while not self._uart.txdone():
+                pass
+        else:
+            # The write may return as soon as the data is buffered,
+            # wait for the computed transmission time
+            end = time.ticks_add(ts, n * self._charUs)
+            while time.ticks_diff(end, time.ticks_us()) > 0:
+                pass
+        self.txen(False)
+
+    def _dropPending(self):
+        size = len(self._ring)
+        self._head = (self._head - self._pending) % size
+        self._count -= self._pending
+        self._pending = 0
+
+    def poll(self):
+        # Moves the bytes buffered by the UART into the ring buffer and
+        # detects the end of frames. Called by recv(), call it more often
+        # if the UART's rxbuf may fill up in between. The bytes are read
+        # through a fixed buffer and copied, not to allocate slices of the
+        # ring
+        uart = self._uart
+        n = uart.any()
+        now = time.ticks_us()
+        if n > 0:
+            self._rxTs = now
+            size = len(self._ring)
+            while n > 0:
+                room = size - self._count
+                if self._discard or room == 0:
+                    if not self._discard:
+                        self._rxOverflows += 1
+                        self._dropPending()
+                        self._discard = True
+                    r = uart.readinto(self._rxBuf, min(n, _RX_CHUNK))
+                else:
+                    rx = self._rxBuf
+                    r = uart.readinto(rx, min(n, room, _RX_CHUNK))
+                    if r:
+                        ring = self._ring
+                        head = self._head
+                        for i in range(r):
+                            ring[head] = rx[i]
+                            head += 1
+                            if head == size:
+                                head = 0
+                        self._head = head
+                        self._count += r
+                        self._pending += r
+                if not r:
+                    break
+                n -= r
+        elif time.ticks_diff(now, self._rxTs) >= self._idleUs:
+            self._discard = False
+            if self._pending > 0:
+                if self._fCount == _RX_FRAMES:
+                    self._rxOverflows += 1
+                    self._dropPending()
+                else:
+                    self._frames[self._fHead] = self._pending
+                    self._fHead = (self._fHead + 1) % _RX_FRAMES
+                    self._fCount += 1
+                    self._pending = 0
+
+    def recv(self, buf):
+        # Copies the oldest complete frame into buf, returns its length or
+        # 0 if none is available. Longer frames are truncated
+        self.poll()
+        if self._fCount == 0:
+            return 0
+        n = self._frames[self._fTail]
+        self._fTail = (self._fTail + 1) % _RX_FRAMES
+        self._fCount -= 1
+        ring = self._ring
+        size = len(ring)
+        tail = self._tail
+        m = min(n, len(buf))
+        for i in range(m):
+            buf[i] = ring[tail]
+            tail += 1
+            if tail == size:
+                tail = 0
+        self._tail = (self._tail + n) % size
+        self._count -= n
+        return m
+
+    def rx_overflows(self, reset=False):
+        ret = self._rxOverflows
+        if reset:
+            self._rxOverflows = 0
+        return ret
@@ -0,0 +1,81 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from array import array
+import time
+
+class TaskScheduler:
+    def __init__(self, size):
+        self._fn = [None] * size
+        self._task = bytearray(size)
+        self._period = array('i', [0] * size)
+        self._deadline = array('i', [0] * size)
+        self._overruns = array('I', [0] * size)
+        self._n = 0
+        self._next = 0
+
+    def add(self, fn, task, periodMs, offsetMs):
+        i = self._n
+        self._fn[i] = fn
+        self._task[i] = task
+        self._period[i] = periodMs
+        self._deadline[i] = time.ticks_add(time.ticks_ms(), offsetMs)
+        self._n = i + 1
+        self._updateNext()
+
+    def _updateNext(self):
+        dl = self._deadline
+        nxt = dl[0]
+        for i in range(1, self._n):
+            if time.ticks_diff(dl[i], nxt) < 0:
+                nxt = dl[i]
+        self._next = nxt
+
+    def period(self, task, periodMs):
+        for i in range(self._n):
+            if self._task[i] == task:
+                self._period[i] = periodMs
+
+    def overruns(self, task, reset=False):
+        ret = 0
+        for i in range(self._n):
+            if self._task[i] == task:
+                ret += self._overruns[i]
+                if reset:
+                    self._overruns[i] = 0
+        return ret
+
+    def run(self):
+        # Runs the most overdue task, if any, returns whether one was run
+        now = time.ticks_ms()
+        if self._n == 0 or time.ticks_diff(now, self._next) < 0:
+            return False
+        dl = self._deadline
+        idx = 0
+        late = time.ticks_diff(now, dl[0])
+        for i in range(1, self._n):
+            d = time.ticks_diff(now, dl[i])
+            if d > late:
+                idx = i
+                late = d
+        period = self._period[idx]
+        if late >= period:
+            # A whole period was missed
+            self._overruns[idx] += 1
+            dl[idx] = time.ticks_add(now, period)
+        else:
+            dl[idx] = time.ticks_add(dl[idx], period)
+        self._updateNext()
+        self._fn[idx]()
+        return True
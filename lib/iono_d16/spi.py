@@ -15,9 +15,21 @@ See file LICENSE.txt for further informations on licensing terms.
 
 from machine import Pin as MPin
 from machine import SPI as MSPI
+from array import array
 import _thread
 import time
-from iono_d16.utils import DEBUG
+
+# Indexes of the SpiFrames.stats counters
+SPI_FRAMES = const(0)
+SPI_RETRIES = const(1)
+SPI_CRC_PREV = const(2)
+SPI_CRC = const(3)
+SPI_FAILURES = const(4)
+
+# Indexes of the Spi.stats counters
+_MUTEX_COUNT = const(0)
+_MUTEX_WAIT_AVG = const(1)
+_MUTEX_WAIT_MAX = const(2)
 
 class Spi:
     PIN_SPI_SCK = const(2)
@@ -29,14 +41,75 @@ class Spi:
                         sck=MPin(PIN_SPI_SCK), mosi=MPin(PIN_SPI_TX),
                         miso=MPin(PIN_SPI_RX))
         Spi.mutex = _thread.allocate_lock()
+        Spi._buf = bytearray(3)
+        Spi.stats = array('I', [0] * 3)
 
-    def transaction(cs, d2, d1, d0):
-        DEBUG(f">>> {cs}: 0x{d2:x} 0x{d1:x} 0x{d0:x}")
-        data = bytearray([d2, d1, d0])
+    def mutexStats(reset=False):
+        # Returns (acquisitions, average wait us, max wait us)
+        st = Spi.stats
+        ret = (st[_MUTEX_COUNT], st[_MUTEX_WAIT_AVG], st[_MUTEX_WAIT_MAX])
+        if reset:
+            st[_MUTEX_COUNT] = 0
+            st[_MUTEX_WAIT_MAX] = 0
+        return ret
+
+    def lock():
+        # Acquires Spi.mutex, counting the wait, to be released by the
+        # caller with Spi.mutex.release()
+        ts = time.ticks_us()
+        Spi.mutex.acquire()
+        wait = time.ticks_diff(time.ticks_us(), ts)
+        st = Spi.stats
+        st[_MUTEX_COUNT] += 1
+        st[_MUTEX_WAIT_AVG] += (wait - st[_MUTEX_WAIT_AVG]) >> 4
+        if wait > st[_MUTEX_WAIT_MAX]:
+            st[_MUTEX_WAIT_MAX] = wait
+
+    def transfer(cs, frame):
+        # Full-duplex, in place: frame holds the received bytes on return
         cs(0)
-        time.sleep_us(1)
-        Spi._spi.write_readinto(data, data)
-        time.sleep_us(1)
+        Spi._spi.write_readinto(frame, frame)
         cs(1)
-        DEBUG(f"<<< {cs}: 0x{data[0]:x} 0x{data[1]:x} 0x{data[2]:x}")
-        return tuple(data)
+
+    def transaction(cs, d2, d1, d0):
+        # Returns the shared receive buffer, valid until the next call.
+        # To be called with Spi.mutex held.
+        data = Spi._buf
+        data[0] = d2
+        data[1] = d1
+        data[2] = d0
+        Spi.transfer(cs, data)
+        return data
+
+class SpiFrames:
+    def __init__(self, size):
+        self.buf = bytearray(size * 3)
+        mv = memoryview(self.buf)
+        self._frames = [mv[i * 3:i * 3 + 3] for i in range(size)]
+        self._cs = [None] * size
+        self._n = 0
+        # Counters updated by run() and by the chip drivers
+        self.stats = array('I', [0] * 5)
+
+    def clear(self):
+        self._n = 0
+
+    def add(self, cs, d2, d1, d0):
+        # Queues a frame, returns the offset of its bytes in buf
+        i = self._n
+        off = i * 3
+        self.buf[off] = d2
+        self.buf[off + 1] = d1
+        self.buf[off + 2] = d0
+        self._cs[i] = cs
+        self._n = i + 1
+        return off
+
+    def run(self):
+        # Transfers all queued frames, the received bytes replace the sent
+        # ones in buf. To be called with Spi.mutex held, taken with
+        # Spi.lock() before clear() so that the frames are not reused by
+        # the other core or a timer callback until parsed
+        for i in range(self._n):
+            Spi.transfer(self._cs[i], self._frames[i])
+        self.stats[SPI_FRAMES] += self._n
@@ -0,0 +1,114 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+from array import array
+import _thread
+
+# Words of the state image, bit 0 = D1 ... bit 15 = D16
+IMG_INPUTS = const(0)
+IMG_WB = const(1)
+IMG_OL = const(2)
+IMG_OV = const(3)
+IMG_OV_LOCK = const(4)
+IMG_THSD = const(5)
+IMG_THSD_LOCK = const(6)
+IMG_ALRM_T1 = const(7)
+IMG_ALRM_T2 = const(8)
+IMG_TS = const(9)
+IMG_SIZE = const(10)
+
+class StateImage:
+    # Written by the core running Iono.process() only, read from any core
+    # without locks: the writer fills the back buffer and then switches
+    # it to the front by incrementing the sequence number
+    def __init__(self):
+        self._img = (array('I', [0] * IMG_SIZE), array('I', [0] * IMG_SIZE))
+        self._seq = 0
+        # Fault clear requests, applied by the writer
+        self._clr = array('I', [0] * IMG_SIZE)
+        self._clrLock = _thread.allocate_lock()
+        self._clrPending = False
+        # Clears taken by the writer, kept posted until published
+        self._clrTaken = None
+
+    def back(self):
+        return self._img[(self._seq + 1) & 1]
+
+    def publish(self):
+        self._seq = (self._seq + 1) & 0x3fffffff
+        taken = self._clrTaken
+        if taken is not None:
+            # The cleared faults are now out of the image
+            self._clrTaken = None
+            with self._clrLock:
+                for i in range(IMG_SIZE):
+                    self._clr[i] &= ~taken[i]
+
+    def word(self, idx):
+        return self._img[self._seq & 1][idx]
+
+    def sample(self):
+        # Returns the (inputs word, timestamp) of the same image
+        while True:
+            seq = self._seq
+            img = self._img[seq & 1]
+            ret = (img[IMG_INPUTS], img[IMG_TS])
+            if seq == self._seq:
+                return ret
+
+    def read(self, buf):
+        # Copies a consistent image into buf, returns its sequence number
+        while True:
+            seq = self._seq
+            img = self._img[seq & 1]
+            for i in range(IMG_SIZE):
+                buf[i] = img[i]
+            # The writer only modifies this buffer after switching it to
+            # the back, i.e. after a new sequence number
+            if seq == self._seq:
+                return seq
+
+    def postClear(self, idx, mask):
+        with self._clrLock:
+            self._clr[idx] |= mask
+            self._clrPending = True
+
+    def postClears(self, img):
+        # Clear of all the fault memories set in img, locks excluded
+        with self._clrLock:
+            for i in (IMG_WB, IMG_OL, IMG_OV, IMG_THSD, IMG_ALRM_T1,
+                        IMG_ALRM_T2):
+                self._clr[i] |= img[i]
+            self._clrPending = True
+
+    def pending(self, idx):
+        # Mask of the faults of word idx with a clear not published yet
+        return self._clr[idx]
+
+    def maskClears(self, img):
+        # Removes from img the faults with a clear not published yet, so
+        # that a read-and-clear returns them only once
+        clr = self._clr
+        # No clears are posted for the locks
+        for i in range(IMG_WB, IMG_ALRM_T2 + 1):
+            img[i] &= ~clr[i]
+
+    def takeClears(self, buf):
+        # The clears stay posted until the next publish()
+        with self._clrLock:
+            for i in range(IMG_SIZE):
+                buf[i] = self._clr[i]
+            self._clrPending = False
+        self._clrTaken = buf
@@ -0,0 +1,57 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+
+from array import array
+
+# Upper bounds of the histogram buckets of the process() duration in us,
+# the last bucket counts the longer ones
+_HIST_US = (100, 200, 500, 1000, 2000, 5000, 10000)
+
+class CycleStats:
+    def __init__(self):
+        self._hist = array('I', [0] * (len(_HIST_US) + 1))
+        self._reset()
+
+    def _reset(self):
+        self._count = 0
+        self._min = 0
+        self._avg = 0
+        self._max = 0
+        for i in range(len(self._hist)):
+            self._hist[i] = 0
+
+    def update(self, us):
+        if self._count == 0:
+            self._min = us
+            self._avg = us
+        elif us < self._min:
+            self._min = us
+        if us > self._max:
+            self._max = us
+        self._avg += (us - self._avg) >> 4
+        self._count += 1
+        i = 0
+        for b in _HIST_US:
+            if us < b:
+                break
+            i += 1
+        self._hist[i] += 1
+
+    def stats(self, reset=False):
+        ret = (self._count, self._min, self._avg, self._max,
+                tuple(self._hist))
+        if reset:
+            self._reset()
+        return ret
@@ -0,0 +1,97 @@
+'''
+Iono RP D16 library
+
+    Copyright (C) 2022-2023 Sfera Labs S.r.l. - All rights reserved.
+
+    For information, see:
+    http://www.sferalabs.cc/
+
+This code is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2.1 of the License, or (at your option) any later version.
+See file LICENSE.txt for further informations on licensing terms.
+'''
+from micropython import const
+import _thread
+import time
+
+class Trace:
+    # Record: ticks_us (4 bytes, little-endian), CS pin, 3 TX bytes,
+    # 3 RX bytes, flags
+    REC_SIZE = const(12)
+
+    F_RETRY = const(0x01)
+    F_CRC_PREV = const(0x02)
+    F_CRC = const(0x04)
+    F_FAIL = const(0x08)
+
+    _buf = None
+
+    def init(records=128):
+        Trace._lock = _thread.allocate_lock()
+        Trace._size = records
+        Trace._idx = 0
+        Trace._count = 0
+        Trace._buf = bytearray(records * REC_SIZE)
+
+    def frame(cs, tx2, tx1, tx0, rx, rxOff, flags):
+        b = Trace._buf
+        if b is None:
+            return
+        with Trace._lock:
+            o = Trace._idx * REC_SIZE
+            ts = time.ticks_us()
+            b[o] = ts & 0xff
+            b[o + 1] = (ts >> 8) & 0xff
+            b[o + 2] = (ts >> 16) & 0xff
+            b[o + 3] = (ts >> 24) & 0xff
+            b[o + 4] = cs
+            b[o + 5] = tx2
+            b[o + 6] = tx1
+            b[o + 7] = tx0
+            b[o + 8] = rx[rxOff]
+            b[o + 9] = rx[rxOff + 1]
+            b[o + 10] = rx[rxOff + 2]
+            b[o + 11] = flags
+            Trace._idx += 1
+            if Trace._idx == Trace._size:
+                Trace._idx = 0
+            if Trace._count < Trace._size:
+                Trace._count += 1
+
+    def clear():
+        if Trace._buf is None:
+            return
+        with Trace._lock:
+            Trace._idx = 0
+            Trace._count = 0
+
+    def dump(out=None):
+        # Writes the records, oldest first, to the out stream or returns
+        # them in a bytearray if out is None. Nothing is recorded before
+        # init()
+        if Trace._buf is None:
+            return bytearray() if out is None else None
+        with Trace._lock:
+            mv = memoryview(Trace._buf)
+            end = Trace._idx * REC_SIZE
+            if Trace._count < Trace._size:
+                parts = (mv[:end],)
+            else:
+                parts = (mv[end:], mv[:end])
+            if out is None:
+                data = bytearray()
+                for p in parts:
+                    data.extend(p)
+                return data
+            for p in parts:
+                out.write(p)
+
+    def decode(data):
+        # Yields (ticks_us, cs, tx, rx, flags) tuples from dumped records
+        for o in range(0, len(data) - REC_SIZE + 1, REC_SIZE):
+            ts = data[o] | (data[o + 1] << 8) | (data[o + 2] << 16) | \
+                    (data[o + 3] << 24)
+            yield (ts, data[o + 4], bytes(data[o + 5:o + 8]),
+                    bytes(data[o + 8:o + 11]), data[o + 11])